@@ -9,7 +9,7 @@ from django.urls import reverse
 class EditSalaryView(View):
     def get(self, request, *args, **kwargs):
         salaryForm = EditSalaryForm()
-        manager = get_object_or_404(Manager, admin=request.user)
+        manager = request.profile.manager_or_404()
         salaryForm.fields['department'].queryset = Department.objects.filter(division=manager.division)
         context = {
             'form': salaryForm,
@@ -49,6 +49,17 @@ class CustomUserAdmin(UserAdmin):
 admin.site.register(CustomUser, CustomUserAdmin)
 
 
+class ApiTokenAdmin(admin.ModelAdmin):
+    # Tokens are created with the create_api_token command
+    list_display = ('name', 'user', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    fields = ('user', 'name', 'is_active')
+    readonly_fields = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+
 # Register other models
 admin.site.register(Admin)
 admin.site.register(Division)
@@ -62,6 +73,11 @@ admin.site.register(FeedbackManager)
 admin.site.register(NotificationManager)
 admin.site.register(NotificationEmployee)
 admin.site.register(Notification)
+admin.site.register(NotificationCounter)
+admin.site.register(NotificationArchive)
+admin.site.register(ClockEvent)
+admin.site.register(ApiToken, ApiTokenAdmin)
+admin.site.register(FaceEnrollmentJob)
 admin.site.register(EmployeeSalary)
 admin.site.register(AttendanceRecord)
 admin.site.register(Break)
@@ -69,5 +85,6 @@ admin.site.register(ActivityFeed)
 admin.site.register(DailySchedule)
 admin.site.register(DailyUpdate)
 admin.site.register(EarylyClockOutRequest)
+admin.site.register(ClockOutEligibility)
 admin.site.register(LeaveBalance)
 admin.site.register(ManagerLeaveBalance)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import hashlib
+import secrets
+
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import ApiToken
+from .utils.versioned_cache import cache_timeout
+
+
+API_TOKEN_CACHE_KEY = 'api_token:{}'
+API_TOKEN_CACHE_TIMEOUT = 60 * 5
+
+
+def token_digest(token):
+    # Tokens are 256 random bits, so a fast hash is enough (unlike passwords)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_api_token(user, name):
+    """Create an ApiToken for ``user`` and return (token_row, plain_token)."""
+    plain = secrets.token_urlsafe(32)
+    token = ApiToken.objects.create(user=user, name=name, digest=token_digest(plain))
+    return token, plain
+
+
+def forget_api_token(digest):
+    cache.delete(API_TOKEN_CACHE_KEY.format(digest))
+
+
+class CachedTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Token <token>`` authentication.
+
+    A verified token's user is cached for a few minutes, so repeat calls
+    from a device cost one cache read and no database query. Revoking or
+    deleting a token, or deactivating its user, drops the cache entry once
+    the change commits (see signals.py). On a per-process cache other
+    workers keep their entry for a few seconds (see cache_timeout).
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            plain = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        digest = token_digest(plain)
+        key = API_TOKEN_CACHE_KEY.format(digest)
+        user = cache.get(key)
+        if user is None:
+            token = ApiToken.objects.select_related('user').filter(digest=digest, is_active=True).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            user = token.user
+            cache.set(key, user, cache_timeout(API_TOKEN_CACHE_TIMEOUT))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, None
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -16,6 +16,7 @@ from asset_app.models import AssetIssue,AssetsIssuance,AssetAssignmentHistory
 from django.db.models import Count,Q
 from django.core.paginator import Paginator,EmptyPage,PageNotAnInteger
 from main_app.notification_badge import send_notification
+from main_app.utils.idempotency import idempotent
 from django.template.loader import render_to_string
 from xhtml2pdf import pisa
 from django.views.decorators.http import require_POST
@@ -82,16 +83,16 @@ def admin_home(request):
     # Filter breaks within the date range and active/ongoing breaks
     employee_breaks_today = Break.objects.filter(
         attendance_record__user_id__in=employee_ids,
-        break_start__date__gte=start_date,
-        break_start__date__lte=end_date,
+        date__gte=start_date,
+        date__lte=end_date,
         break_end__isnull=True  # Only ongoing breaks
         
     ).distinct()
     
     manager_breaks_today = Break.objects.filter(
         attendance_record__user_id__in=manager_ids,
-        break_start__date__gte=start_date,
-        break_start__date__lte=end_date,
+        date__gte=start_date,
+        date__lte=end_date,
         break_end__isnull=True  # Only ongoing breaks
     ).distinct()
     
@@ -101,8 +102,8 @@ def admin_home(request):
     break_entries = []
     break_queryset = Break.objects.filter(
         attendance_record__user_id__in=all_user_ids,
-        break_start__date__gte=start_date,
-        break_start__date__lte=end_date
+        date__gte=start_date,
+        date__lte=end_date
     ).select_related('attendance_record__user').order_by('-break_start')
     
     for b in break_queryset:
@@ -1425,6 +1426,7 @@ def send_manager_notification(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def send_bulk_manager_notification(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -1456,6 +1458,7 @@ def send_bulk_manager_notification(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def send_selected_manager_notification(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -1550,6 +1553,7 @@ def send_employee_notification(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def send_bulk_employee_notification(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -1582,6 +1586,7 @@ def send_bulk_employee_notification(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def send_selected_employee_notification(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -0,0 +1,55 @@
+import json
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .notification_badge import badge_payload, get_unread_counts, is_hr_manager
+from .utils.realtime import HR_ASSET_GROUP, user_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Per-user push channel for badge counts, new notifications and clock state.
+
+    Messages are JSON objects with a ``type`` of ``badge`` (same fields as the
+    check-notifications endpoint), ``notification`` or ``clock``.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.joined_groups = [user_group(self.user.pk)]
+        if self.user.user_type == '2' and await database_sync_to_async(is_hr_manager)(self.user):
+            self.joined_groups.append(HR_ASSET_GROUP)
+        for group in self.joined_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        await self.accept()
+        await self.send_badge()
+
+    async def disconnect(self, code):
+        for group in getattr(self, 'joined_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # The only client message is an explicit refresh request
+        if content.get('type') == 'refresh':
+            await self.send_badge()
+
+    async def badge_update(self, event):
+        await self.send_badge()
+
+    async def push_event(self, event):
+        await self.send_json({**event['payload'], 'type': event['event']})
+
+    async def send_badge(self):
+        counts = await database_sync_to_async(get_unread_counts)(self.user)
+        await self.send_json({**badge_payload(counts), 'type': 'badge'})
+
+    @classmethod
+    async def encode_json(cls, content):
+        return json.dumps(content, cls=DjangoJSONEncoder)
@@ -1,26 +1,17 @@
-from .models import CustomUser, AttendanceRecord, Notification, EarylyClockOutRequest
-from django.utils import timezone
-from django.contrib.auth.models import AnonymousUser
-from zoneinfo import ZoneInfo
+import logging
 from datetime import datetime, timedelta
-
-from django.utils import timezone
-from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
-from calendar import monthrange
-import logging
-from .models import CustomUser, AttendanceRecord, EarylyClockOutRequest, Employee, LeaveBalance
-from django.shortcuts import get_object_or_404
 
-
-
-from django.utils import timezone
 from django.contrib.auth.models import AnonymousUser
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from .models import AttendanceRecord, CustomUser, EarylyClockOutRequest
-import logging
-from .models import Manager
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import LeaveBalance, NotificationCounter
+from .notification_badge import get_unread_counts
+from .utils.attendance_state import get_attendance_state
+from .utils.lazy_context import lazy_context
+from .utils.request_profile import get_request_profile
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +23,8 @@ def clock_times(request):
         "complete_8Hours": False,
         "work_duration": None,
         "remaining_time": None,
+        "open_break": None,
+        "clock_out_blocked_reason": None,
     }
 
     user = request.user
@@ -39,28 +32,24 @@ def clock_times(request):
         return context
 
     try:
-        custom_user = CustomUser.objects.get(id=user.id)
+        # One cache read; the attendance, break and early clock-out signals
+        # drop the state and the first read after them rebuilds it.
+        state = get_attendance_state(user.pk)
         today = timezone.now().astimezone(ZoneInfo('Asia/Kolkata')).date()
-        
-        # Get the latest attendance record
-        latest_entry = AttendanceRecord.objects.filter(user=custom_user).order_by("-clock_in").first()
-        
-        # Get current active clock-in record
-        current_record = AttendanceRecord.objects.filter(
-            user=custom_user,
-            clock_out__isnull=True,
-            date=today,
-            status__in=['present', 'late', 'half_day']
-        ).first()
-
-        if latest_entry and latest_entry.clock_in:
+
+        latest_entry = state['latest']
+        current_record = state['open_record']
+        if current_record and current_record['date'] != today:
+            current_record = None
+
+        if latest_entry and latest_entry['clock_in']:
             try:
-                clock_in_time = latest_entry.clock_in.astimezone(ZoneInfo('Asia/Kolkata'))
+                clock_in_time = latest_entry['clock_in'].astimezone(ZoneInfo('Asia/Kolkata'))
                 current_time = datetime.now(ZoneInfo('Asia/Kolkata'))
                 work_duration = current_time - clock_in_time
                 
                 # determine worked duration based on the status
-                if latest_entry.status == 'half_day':
+                if latest_entry['status'] == 'half_day':
                     fixed_time = timedelta(hours=4 , minutes=30)
                 else:
                     fixed_time = timedelta(hours=8 , minutes=30)
@@ -72,196 +61,61 @@ def clock_times(request):
                 else:
                     context['remaining_time'] = int((fixed_time - work_duration).total_seconds())
             except AttributeError as e:
-                logger.error(f"Error processing clock_in for latest_entry {latest_entry.id if latest_entry else 'None'}: {str(e)}")
-                context['latest_entry'] = None
+                logger.error(f"Error processing clock_in for latest_entry {latest_entry['id']}: {str(e)}")
+                latest_entry = None
 
+        if current_record and state['early_clock_out_approved']:
+            context['can_clock_out'] = True
         if current_record:
-            early_request = EarylyClockOutRequest.objects.filter(
-                attendance_record=current_record,
-                status='approved'
-            ).exists()
-            if early_request:
-                context['can_clock_out'] = True
+            context['clock_out_blocked_reason'] = state['clock_out_blocked_reason']
 
         context["latest_entry"] = latest_entry
         context["current_record"] = current_record
+        context["open_break"] = state['open_break'] if current_record else None
 
-    except CustomUser.DoesNotExist:
-        logger.warning(f"CustomUser not found for user ID {user.id}")
     except Exception as e:
         logger.error(f"Error in clock_times for user {user.id}: {str(e)}")
 
     return context
 
 def unread_notification_count(request):
-    employee_leave_request_to_manager_count = 0
-    manager_general_count = 0
-    employee_clockout_request_to_manager_count = 0
-    employee_notification_from_manager_count = 0
-    employee_leave_approved_or_rejected_notification_count = 0
-    employee_asset_request = 0
-    total_asset_unread_notifications = 0
-    total_unread_notifications = 0
-    total_notification_leave_assset = 0
-    manager_leave_request_from_ceo_count = 0
-    employee_asset_request_count = 0
-
     if request.user.is_authenticated:
-        if request.user.user_type == '2':
-            manager = get_object_or_404(Manager, admin=request.user)
-            manager_department = manager.department.name.lower().strip()
-
-            manager_general_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='general-notification',
-                role="manager"
-            ).count()
-            if manager_department in ['hr','h r']:                 
-                employee_asset_request_count = Notification.objects.filter(
-                    is_read = False , 
-                    notification_type = 'asset-notification',
-                    role = 'manager'
-                ).count()
-
-                employee_clockout_request_to_manager_count = Notification.objects.filter(
-                    user=request.user,
-                    is_read=False,
-                    notification_type='clockout-notification',
-                    role="manager"
-                ).count()
-
-                employee_asset_claim_request_to_manager_count = Notification.objects.filter(
-                    is_read=False,
-                    notification_type='asset-notification',
-                    role="manager"
-                ).count()
-
-            employee_clockout_request_to_manager_count = Notification.objects.filter(
-                    user=request.user,
-                    is_read=False,
-                    notification_type='clockout-notification',
-                    role="manager"
-                ).count()
-            
-            employee_leave_request_to_manager_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='leave-notification',
-                role="manager"
-            ).count()
-
-            manager_leave_request_from_ceo_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='manager-leave-notification',
-                role="manager"
-            ).count()
-
-            total_unread_notifications = (
-                manager_general_count +
-                employee_leave_request_to_manager_count +
-                employee_clockout_request_to_manager_count +
-                employee_asset_request_count + manager_leave_request_from_ceo_count
-            )
+        counts = get_unread_counts(request.user, get_request_profile(request))
 
+        if counts['user_type'] == '2':
             total_unread_notifications_gen_leave_clockout = (
-                manager_general_count +
-                employee_leave_request_to_manager_count +
-                employee_clockout_request_to_manager_count 
-            )
-
-            total_asset_unread_notifications = (
-                employee_asset_request_count
+                counts['general'] + counts['leave'] + counts['clockout']
             )
 
             return {
-                'total_unread_notifications': total_unread_notifications,
-                'manager_general_count': manager_general_count,
-                'employee_leave_request_to_manager_count': employee_leave_request_to_manager_count,
-                'employee_clockout_request_to_manager_count': employee_clockout_request_to_manager_count,
-                'manager_leave_request_from_ceo_count' : manager_leave_request_from_ceo_count,
+                'total_unread_notifications': counts['total'],
+                'manager_general_count': counts['general'],
+                'employee_leave_request_to_manager_count': counts['leave'],
+                'employee_clockout_request_to_manager_count': counts['clockout'],
+                'manager_leave_request_from_ceo_count' : counts['manager_leave'],
                 'total_unread_notifications_gen_leave_clockout' : total_unread_notifications_gen_leave_clockout,
 
-                'employee_asset_request_count' : employee_asset_request_count,
-                'total_asset_unread_notifications': total_asset_unread_notifications,
+                'employee_asset_request_count' : counts['asset'],
+                'total_asset_unread_notifications': counts['asset'],
                 
             }
         
-        elif request.user.user_type == '1':
-            ceo_notification_from_manager_leave_request = Notification.objects.filter(
-                user = request.user,
-                is_read = False,
-                notification_type__in = ['manager-leave-notification'],
-                role = 'ceo'
-            ).count()
-            
-            ceo_notification_from_employee_leave_request = Notification.objects.filter(
-                user = request.user,
-                is_read = False,
-                notification_type__in = ['employee-leave-notification'],
-                role = 'ceo'
-            ).count()
-
-            total_unread_notifications = (ceo_notification_from_manager_leave_request + ceo_notification_from_employee_leave_request)
-
+        elif counts['user_type'] == '1':
             return {
-                'total_unread_notifications': total_unread_notifications,
-                'ceo_notification_from_manager_leave_request' : ceo_notification_from_manager_leave_request,
-                'ceo_notification_from_employee_leave_request' : ceo_notification_from_employee_leave_request
+                'total_unread_notifications': counts['total'],
+                'ceo_notification_from_manager_leave_request' : counts['manager_leave'],
+                'ceo_notification_from_employee_leave_request' : counts['employee_leave']
             }
 
         else:
-            employee_notification_from_manager_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type__in=['notification-from-manager', 'notification-from-admin'],
-                role="employee"
-            ).count()
-
-            employee_leave_approved_or_rejected_notification_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='leave-notification',
-                role="employee"
-            ).count()
-
-            employee_clockout_request_to_manager_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='clockout-notification',
-                role="employee"
-            ).count()
-
-            employee_asset_request = Notification.objects.filter(
-                user = request.user , 
-                is_read = False , 
-                notification_type = 'asset-notification',
-                role = 'employee' 
-            ).count()
-
-            total_notification_leave_assset = (
-                employee_leave_approved_or_rejected_notification_count +
-                employee_asset_request 
-            )
-
-            total_general_unread_notification = (
-                employee_notification_from_manager_count 
-            )
-
-            total_unread_notifications = (
-                employee_leave_approved_or_rejected_notification_count +
-                employee_asset_request + employee_notification_from_manager_count
-            )
-
             return {
-                'total_unread_notifications': total_unread_notifications,
-                'total_general_unread_notification' : total_general_unread_notification,
-                'employee_notification_from_manager_count': employee_notification_from_manager_count,
-                'employee_leave_approved_or_rejected_notification_count': employee_leave_approved_or_rejected_notification_count,
-                'employee_clockout_request_to_manager_count': employee_clockout_request_to_manager_count,
-                'employee_asset_request' : employee_asset_request,
-                'total_notification_leave_assset' : total_notification_leave_assset
+                'total_unread_notifications': counts['total'],
+                'total_general_unread_notification' : counts['from_manager'],
+                'employee_notification_from_manager_count': counts['from_manager'],
+                'employee_leave_approved_or_rejected_notification_count': counts['leave_status'],
+                'employee_clockout_request_to_manager_count': counts['clockout'],
+                'employee_asset_request' : counts['asset'],
+                'total_notification_leave_assset' : counts['leave_status'] + counts['asset']
             }
     
     # Add a default return dictionary if the user is not authenticated
@@ -297,7 +151,7 @@ def leave_balance_context(request):
             'department': '',
         }
 
-    employee = getattr(request.user, 'employee', None)
+    employee = get_request_profile(request).employee
     if not employee:
         return {
             'yearly_leave_data': [],
@@ -306,62 +160,11 @@ def leave_balance_context(request):
             'department': 'N/A',
         }
 
-    current_year = timezone.now().year
-    current_month = timezone.now().month
-    yearly_leave_data = []
-    total_available_leaves = 0.0
-
-    # Check for the first clock-in to determine if LeaveBalance records exist
-    first_clock_in = AttendanceRecord.objects.filter(
-        user=request.user,
-        status__in=['present', 'late', 'half_day']
-    ).order_by('date').first()
-
-    if first_clock_in:
-        # If there's a clock-in, ensure LeaveBalance records are initialized
-        LeaveBalance.initialize_balances(employee, timezone.now().date())
-
-        # Fetch leave balances for the current year
-        leave_balances = LeaveBalance.objects.filter(
-            employee=employee,
-            year=current_year
-        ).order_by('month')
-
-        for month in range(1, 13):
-            balance = leave_balances.filter(month=month).first()
-            if balance:
-                yearly_leave_data.append({
-                    'month': month,
-                    'allocated_leaves': balance.allocated_leaves,
-                    'carried_forward': balance.carried_forward,
-                    'used_leaves': balance.used_leaves,
-                    'available_leaves': balance.total_available_leaves(),
-                })
-            else:
-                # For future months, show default values
-                yearly_leave_data.append({
-                    'month': month,
-                    'allocated_leaves': 0.0,
-                    'carried_forward': 0.0,
-                    'used_leaves': 0.0,
-                    'available_leaves': 0.0,
-                })
-
-        # Get the current month's balance to compute total available leaves
-        current_balance = LeaveBalance.get_balance(employee, current_year, current_month)
-        if current_balance:
-            total_available_leaves = current_balance.total_available_leaves()
-
-    else:
-        # No clock-in yet, so no LeaveBalance records should exist
-        for month in range(1, 13):
-            yearly_leave_data.append({
-                'month': month,
-                'allocated_leaves': 0.0,
-                'carried_forward': 0.0,
-                'used_leaves': 0.0,
-                'available_leaves': 0.0,
-            })
+    # Balances are materialized at clock-in and by the rollover_leave_balances
+    # command, so rendering only reads the current year's rows.
+    summary = LeaveBalance.get_yearly_summary(employee, timezone.now().date())
+    yearly_leave_data = summary['yearly_leave_data']
+    total_available_leaves = summary['total_available_leaves']
 
     return {
         'yearly_leave_data': yearly_leave_data,
@@ -372,43 +175,6 @@ def leave_balance_context(request):
 
 
 
-# def unread_notification_count(request):
-#     if request.user.is_authenticated:
-#         employee_general_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='notification',role = "employee").count()
-#         manager_general_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='notification',role = "manager").count()
-#         admin_general_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='notification',role = "admin").count()
-#         admin_employee_feedback_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='employee feedback',role = "admin").count()
-#         employee_leave_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='leave',role = "employee").count()
-#         manager_leave_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='leave',role = "manager").count()
-#         admin_leave_count = Notification.objects.filter(user=request.user, is_read=False, notification_type='leave',role = "admin").count()
-#         print("general_countgeneral_count>>",employee_general_count,"manager_general_count>>>",manager_general_count,"admin_general_count>>>>>>",admin_general_count,request.user)
-#         print("employee_leave_count>>>",employee_leave_count,"manager_leave_count>>>",manager_leave_count,"admin_leave_count>>>>>",admin_leave_count,request.user)
-#         print("admin_employee_feedback_count>>",admin_employee_feedback_count)
-#     else:
-#         general_count = 0
-#         leave_count = 0
-#         employee_general_count = 0
-#         manager_general_count = 0
-#         admin_general_count = 0
-#         admin_employee_feedback_count = 0
-#         employee_leave_count = 0
-#         manager_leave_count= 0
-#         admin_leave_count= 0
-
-#     return {
-#         # 'unread_general_notification_count': general_count,
-#         'unread_employee_general_notification_count': employee_general_count,
-#         'unread_manager_general_notification_count': manager_general_count,
-#         'admin_employee_feedback_count':admin_employee_feedback_count,
-#         'admin_general_count':admin_general_count,
-#         # 'unread_leave_notification_count': leave_count,
-#         'unread_employee_leave_notification_count': employee_leave_count,
-#         'unread_manager_leave_notification_count': manager_leave_count,
-#         'admin_leave_count':admin_leave_count
-#     }
-
-from .models import Notification
-
 def admin_notification_count(request):
     context = {
         'unread_admin_manager_leave_count': 0,
@@ -417,19 +183,16 @@ def admin_notification_count(request):
     }
     
     if request.user.is_authenticated and request.user.is_superuser:
-        # Count of unread manager leave applications for admin
-        context['unread_admin_manager_leave_count'] = Notification.objects.filter(
-            is_read=False,
-            notification_type='leave',
-            role='manager'  # notifications from managers
-        ).count()
-        
-        # Count of general notifications for admin
-        context['unread_admin_general_count'] = Notification.objects.filter(
-            is_read=False,
-            notification_type='notification',
-            role='admin'  # notifications meant for admin
-        ).count()
+        # Both counts span every user, so sum the per-user unread counters
+        # instead of counting Notification rows.
+        counts = NotificationCounter.objects.aggregate(
+            # Count of unread manager leave applications for admin
+            manager_leave=Coalesce(Sum('unread', filter=Q(notification_type='leave', role='manager')), 0),
+            # Count of general notifications for admin
+            general=Coalesce(Sum('unread', filter=Q(notification_type='notification', role='admin')), 0),
+        )
+        context['unread_admin_manager_leave_count'] = counts['manager_leave']
+        context['unread_admin_general_count'] = counts['general']
         
         # Total admin notifications count
         context['total_admin_notifications'] = (
@@ -439,89 +202,6 @@ def admin_notification_count(request):
     
     return context
     
-# def unread_notification_count(request):
-#     if not request.user.is_authenticated:
-#         return {
-#             'unread_employee_general_notification_count': 0,
-#             'unread_manager_general_notification_count': 0,
-#             'admin_employee_feedback_count': 0,
-#             'admin_general_count': 0,
-#             'unread_employee_leave_notification_count': 0,
-#             'unread_manager_leave_notification_count': 0,
-#             'admin_leave_count': 0
-#         }
-    
-#     context = {
-#         'unread_employee_general_notification_count': 0,
-#         'unread_manager_general_notification_count': 0,
-#         'admin_employee_feedback_count': 0,
-#         'admin_general_count': 0,
-#         'unread_employee_leave_notification_count': 0,
-#         'unread_manager_leave_notification_count': 0,
-#         'admin_leave_count': 0
-#     }
-
-#     try:
-      
-#         general_notifications = Notification.objects.filter(
-#             user=request.user,
-#             is_read=False
-#         ).exclude(
-#             notification_type__in=['asset_request', 'asset_issue']
-#         )
-
-#         # Employee counts
-#         if hasattr(request.user, 'employee'):
-#             context.update({
-#                 'unread_employee_general_notification_count': general_notifications.filter(
-#                     role="employee",
-#                     notification_type="notification"
-#                 ).count(),
-#                 'unread_employee_leave_notification_count': general_notifications.filter(
-#                     role="employee",
-#                     notification_type="leave"
-#                 ).count()
-#             })
-
-#         # Manager counts
-#         elif hasattr(request.user, 'manager'):
-#             context.update({
-#                 'unread_manager_general_notification_count': general_notifications.filter(
-#                     role="manager",
-#                     notification_type="notification"
-#                 ).count(),
-#                 'unread_manager_leave_notification_count': general_notifications.filter(
-#                     role="manager",
-#                     notification_type="leave"
-#                 ).count()
-#             })
-
-#         # Admin counts
-#         elif hasattr(request.user, 'admin'):
-#             context.update({
-#                 'admin_general_count': general_notifications.filter(
-#                     role="admin",
-#                     notification_type="notification"
-#                 ).count(),
-#                 'admin_employee_feedback_count': general_notifications.filter(
-#                     role="admin",
-#                     notification_type="employee feedback"
-#                 ).count(),
-#                 'admin_leave_count': general_notifications.filter(
-#                     role="admin",
-#                     notification_type="leave"
-#                 ).count()
-#             })
-
-#     except Exception as e:
-#         # Log error but don't break the site
-#         import logging
-#         logging.error(f"Error in unread_notification_count context processor: {str(e)}")
-    
-#     return context
-
-
-
 def asset_notification_count(request):
     if not request.user.is_authenticated:
         return {
@@ -536,38 +216,29 @@ def asset_notification_count(request):
         'unread_asset_issue_count': 0
     }
 
+    profile = get_request_profile(request)
+    asset_request = Q(notification_type='asset_request')
+    asset_issue = Q(notification_type='asset_issue')
     try:
         # For Managers (Asset Requests)
-        if hasattr(request.user, 'manager'):
-            # Count pending asset requests (manager-specific)
-            asset_request_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='asset_request',
-                role="manager"
-            ).count()
-            
-            # Count pending asset issues (global, but manager can see)
-            asset_issue_count = Notification.objects.filter(
-                is_read=False,
-                notification_type='asset_issue',
-                role="manager"
-            ).count()
-            
+        if profile.manager:
+            counts = NotificationCounter.objects.filter(role='manager').aggregate(
+                # Count pending asset requests (manager-specific)
+                requests=Coalesce(Sum('unread', filter=asset_request & Q(user=request.user)), 0),
+                # Count pending asset issues (global, but manager can see)
+                issues=Coalesce(Sum('unread', filter=asset_issue), 0),
+            )
             context.update({
-                'unread_asset_notification_count': asset_request_count + asset_issue_count,
-                'unread_asset_request_count': asset_request_count,
-                'unread_asset_issue_count': asset_issue_count
+                'unread_asset_notification_count': counts['requests'] + counts['issues'],
+                'unread_asset_request_count': counts['requests'],
+                'unread_asset_issue_count': counts['issues']
             })
 
         # For Employees (if they can have asset notifications)
-        elif hasattr(request.user, 'employee'):
-            asset_issue_count = Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-                notification_type='asset_issue',
-                role="employee"
-            ).count()
+        elif profile.employee:
+            asset_issue_count = NotificationCounter.objects.filter(
+                asset_issue, user=request.user, role='employee'
+            ).aggregate(total=Coalesce(Sum('unread'), 0))['total']
             
             context.update({
                 'unread_asset_notification_count': asset_issue_count,
@@ -575,27 +246,61 @@ def asset_notification_count(request):
             })
 
         # For Admins (if they need to see all asset notifications)
-        elif hasattr(request.user, 'admin'):
-            asset_request_count = Notification.objects.filter(
-                is_read=False,
-                notification_type='asset_request'
-            ).count()
-            
-            asset_issue_count = Notification.objects.filter(
-                is_read=False,
-                notification_type='asset_issue'
-            ).count()
-            
+        elif profile.admin:
+            counts = NotificationCounter.objects.filter(asset_request | asset_issue).aggregate(
+                requests=Coalesce(Sum('unread', filter=asset_request), 0),
+                issues=Coalesce(Sum('unread', filter=asset_issue), 0),
+            )
             context.update({
-                'unread_asset_notification_count': asset_request_count + asset_issue_count,
-                'unread_asset_request_count': asset_request_count,
-                'unread_asset_issue_count': asset_issue_count
+                'unread_asset_notification_count': counts['requests'] + counts['issues'],
+                'unread_asset_request_count': counts['requests'],
+                'unread_asset_issue_count': counts['issues']
             })
 
     except Exception as e:
         # Log error but don't break the site
-        import logging
-        logging.error(f"Error in asset_notification_count context processor: {str(e)}")
+        logger.error(f"Error in asset_notification_count context processor: {str(e)}")
     
     return context
 
+
+
+# Lazy variants registered in settings.TEMPLATES: each processor only runs
+# when the rendered template reads one of its keys.
+
+lazy_clock_times = lazy_context(clock_times, [
+    'latest_entry', 'current_record', 'can_clock_out',
+    'complete_8Hours', 'work_duration', 'remaining_time', 'open_break',
+    'clock_out_blocked_reason',
+])
+
+lazy_unread_notification_count = lazy_context(unread_notification_count, [
+    'total_unread_notifications',
+    'manager_general_count',
+    'employee_leave_request_to_manager_count',
+    'employee_clockout_request_to_manager_count',
+    'manager_leave_request_from_ceo_count',
+    'total_unread_notifications_gen_leave_clockout',
+    'employee_asset_request_count',
+    'total_asset_unread_notifications',
+    'ceo_notification_from_manager_leave_request',
+    'ceo_notification_from_employee_leave_request',
+    'total_general_unread_notification',
+    'employee_notification_from_manager_count',
+    'employee_leave_approved_or_rejected_notification_count',
+    'employee_asset_request',
+    'total_asset_notification',
+    'total_notification_leave_assset',
+])
+
+lazy_asset_notification_count = lazy_context(asset_notification_count, [
+    'unread_asset_notification_count', 'unread_asset_request_count', 'unread_asset_issue_count',
+])
+
+lazy_admin_notification_count = lazy_context(admin_notification_count, [
+    'unread_admin_manager_leave_count', 'unread_admin_general_count', 'total_admin_notifications',
+])
+
+lazy_leave_balance_context = lazy_context(leave_balance_context, [
+    'yearly_leave_data', 'total_available_leaves', 'employee_name', 'department',
+])
@@ -25,6 +25,8 @@ from zoneinfo import ZoneInfo
 import logging
 from django.utils.timezone import make_aware, now
 from .utils.email_utils import send_emails_in_background
+from .utils.clock_out_eligibility import get_clock_out_eligibility
+from .utils.idempotency import idempotent
 
 
 
@@ -47,7 +49,7 @@ def make_aware_if_naive(dt, timezone=ZoneInfo('Asia/Kolkata')):
 def employee_home(request):
     today = timezone.now().date()
     current_time = timezone.now()
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     
     logger.info(f"Employee {request.user.username} accessing dashboard on {today}")
 
@@ -64,12 +66,11 @@ def employee_home(request):
     total_available_leaves = 0.0
 
     if first_clock_in_date:
-        LeaveBalance.initialize_balances(employee, today)
         balance = LeaveBalance.get_balance(employee, today.year, today.month)
         if balance:
             logger.debug(f"Original Leave balance for {today.year}-{today.month}: Allocated={balance.allocated_leaves}, Carried Forward={balance.carried_forward}, Used={balance.used_leaves}, Available={balance.total_available_leaves()}")
         else:
-            logger.warning(f"No LeaveBalance found for {today.year}-{today.month} after initialization")
+            logger.warning(f"No LeaveBalance found for {today.year}-{today.month}, run rollover_leave_balances")
 
     # Get filters from request
     date_filter = request.GET.get('date', "today")
@@ -158,24 +159,15 @@ def employee_home(request):
     except EmptyPage:
         paginated_entries = paginator.page(paginator.num_pages)
 
+    # Break totals are stored on the record, so no join over breaks is needed
     daily_view = records.annotate(
-        total_break_time=Coalesce(
-            Sum('breaks__duration', output_field=DurationField()),
-            timedelta()
-        )
-    ).annotate(
         net_worked_time=ExpressionWrapper(
             F('total_worked') - F('total_break_time'),
             output_field=DurationField()
         )
     ).order_by('-date')
 
-    completed_records = records.filter(clock_out__isnull=False).annotate(
-        total_break_time=Coalesce(
-            Sum('breaks__duration', output_field=DurationField()),
-            timedelta()
-        )
-    )
+    completed_records = records.filter(clock_out__isnull=False)
 
     weekly_data = {}
     for record in completed_records:
@@ -187,8 +179,7 @@ def employee_home(request):
                 'overtime_hours': timedelta(),
                 'week_start': record.date - timedelta(days=record.date.weekday())
             }
-        net_worked = record.total_worked - record.total_break_time
-        weekly_data[week]['total_hours'] += net_worked
+        weekly_data[week]['total_hours'] += record.net_worked
         weekly_data[week]['regular_hours'] += record.regular_hours
         weekly_data[week]['overtime_hours'] += record.overtime_hours
 
@@ -212,8 +203,7 @@ def employee_home(request):
                 'late_days': 0,
                 'half_days': 0
             }
-        net_worked = record.total_worked - record.total_break_time
-        monthly_data[month_start_date]['total_hours'] += net_worked
+        monthly_data[month_start_date]['total_hours'] += record.net_worked
         monthly_data[month_start_date]['regular_hours'] += record.regular_hours
         monthly_data[month_start_date]['overtime_hours'] += record.overtime_hours
         leave = LeaveReportEmployee.objects.filter(
@@ -472,31 +462,16 @@ def employee_home(request):
     employee_name = leave_context.get('employee_name', employee.admin.get_full_name())
     department = leave_context.get('department', employee.department.name if employee.department else 'N/A')
 
-    current_record = AttendanceRecord.objects.filter(
+    current_record = AttendanceRecord.objects.select_related('open_break').filter(
         user=request.user,
         clock_out__isnull=True,
         date=today,
         status__in=['present', 'late', 'half_day']
     ).first()
 
-    current_break = None
-    if current_record:
-        current_break = Break.objects.filter(
-            attendance_record=current_record,
-            break_end__isnull=True
-        ).first()
+    current_break = current_record.open_break if current_record else None
 
-    schedule = DailySchedule.objects.filter(
-        employee=employee,
-        date=today
-    ).first()
-
-    has_submitted_update = False
-    if schedule:
-        has_submitted_update = DailyUpdate.objects.filter(
-            schedule=schedule,
-            updated_at__date=today
-        ).exists()
+    has_submitted_update = get_clock_out_eligibility(request.user.id, today).update_submitted
     logger.debug(f"Has submitted update: {has_submitted_update}")
 
     total_breaks_in_month = Break.objects.filter(
@@ -505,10 +480,10 @@ def employee_home(request):
         attendance_record__user=request.user
     ).count()
 
-    todays_breaks = Break.objects.filter(
-        attendance_record__date=today,
-        attendance_record__user=request.user
-    ).count()
+    todays_breaks = AttendanceRecord.objects.filter(
+        date=today,
+        user=request.user
+    ).aggregate(total=Coalesce(Sum('break_count'), 0))['total']
 
     logger.info(f"Final Attendance Stats - Total Working Days: {total_working_days}, Present Days: {present_days}, Late Days: {late_days}, Half Days: {half_days}, Absent Days: {absent_days}")
 
@@ -568,7 +543,7 @@ def employee_home(request):
             try:
                 today_total_worked = last_clock_out - first_clock_in
                 total_break_time = sum(
-                    (brk.duration for record in today_records for brk in record.breaks.all() if brk.duration),
+                    (record.total_break_time for record in today_records),
                     timedelta()
                 )
                 today_total_worked -= total_break_time
@@ -583,7 +558,7 @@ def employee_home(request):
             try:
                 current_duration = current_time - first_clock_in
                 total_break_time = sum(
-                    (brk.duration for record in today_records for brk in record.breaks.all() if brk.duration),
+                    (record.total_break_time for record in today_records),
                     timedelta()
                 )
                 current_duration -= total_break_time
@@ -602,11 +577,7 @@ def employee_home(request):
             today_duration_str = "0 hours 0 minutes"
             today_late_duration_str = "0 hours 0 minutes"
 
-    lunch_taken = Break.objects.filter(
-        attendance_record__user=request.user,
-        attendance_record__date=today,
-        break_type='lunch'
-    ).exists()
+    lunch_taken = any(record.lunch_taken for record in today_records)
     on_break = current_break is not None
     lunch_break = Break.objects.filter(
         attendance_record__user=request.user,
@@ -703,7 +674,7 @@ logger = logging.getLogger(__name__)
 
 @login_required
 def leave_balance(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     today = get_ist_date()
     current_year = today.year
     current_month = today.month
@@ -796,8 +767,9 @@ def leave_balance(request):
     
 
 @login_required
+@idempotent(in_progress_redirect='employee_apply_leave')
 def employee_apply_leave(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     unread_ids = Notification.objects.filter(
         user=request.user,
         role="employee",
@@ -1000,7 +972,7 @@ def employee_feedback(request):
 
 @login_required   
 def employee_view_profile(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     context = {'employee': employee,
                'page_title': 'Profile'
                }
@@ -1025,7 +997,7 @@ logger = logging.getLogger(__name__)
 @csrf_exempt
 def employee_view_attendance(request):
     try:
-        employee = get_object_or_404(Employee, admin=request.user)
+        employee = request.profile.employee_or_404()
         
         if request.method == 'GET':
             division = get_object_or_404(Division, id=employee.division.id)
@@ -1159,7 +1131,7 @@ def employee_view_attendance(request):
         
 @login_required   
 def employee_view_salary(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     salarys = EmployeeSalary.objects.filter(employee=employee)
     context = {
         'salarys': salarys,
@@ -1170,7 +1142,7 @@ def employee_view_salary(request):
 
 @login_required   
 def employee_view_notification(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     
     
     all_notifications = NotificationEmployee.objects.filter(
@@ -1284,7 +1256,7 @@ def get_ist_datetime():
 
 @login_required
 def daily_schedule(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     today = timezone.now().date()
     now = timezone.now()
 
@@ -1427,7 +1399,7 @@ def get_ist_date():
 
 @login_required
 def todays_update(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     today = timezone.now().date()
     schedule = DailySchedule.objects.filter(employee=employee, date=today).first()
 
@@ -1563,7 +1535,7 @@ def todays_update(request):
 
 def view_all_schedules(request):
     """View all schedules and their updates for the logged-in employee"""
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     today = get_ist_date()
 
     schedules = DailySchedule.objects.filter(employee=employee).order_by('-date')
@@ -1670,7 +1642,7 @@ def view_all_schedules(request):
 
 @login_required
 def others_schedule(request):
-    employee = get_object_or_404(Employee, admin=request.user)
+    employee = request.profile.employee_or_404()
     if not employee.department:
         messages.error(request, "You are not assigned to a department.")
         return redirect('all_schedules')
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from main_app.models import Notification, NotificationArchive
+
+
+ARCHIVED_FIELDS = ('id', 'user_id', 'role', 'message', 'notification_type', 'timestamp', 'leave_or_notification_id')
+
+
+class Command(BaseCommand):
+    help = "Move read notifications older than --days into NotificationArchive. Schedule it nightly."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Archive read notifications older than this.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1.")
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old_read = Notification.objects.filter(is_read=True, timestamp__lt=cutoff).order_by('pk')
+
+        archived = 0
+        while True:
+            with transaction.atomic():
+                rows = list(old_read.values(*ARCHIVED_FIELDS)[:options['batch_size']])
+                if not rows:
+                    break
+                NotificationArchive.objects.bulk_create([
+                    NotificationArchive(
+                        original_id=row['id'],
+                        user_id=row['user_id'],
+                        role=row['role'],
+                        message=row['message'],
+                        notification_type=row['notification_type'],
+                        timestamp=row['timestamp'],
+                        leave_or_notification_id=row['leave_or_notification_id'],
+                    )
+                    for row in rows
+                ], ignore_conflicts=True)
+                ids = [row['id'] for row in rows]
+                # Delete through the same filter, so a row marked unread since the copy
+                # stays. No per-row signals: read rows affect no counter or badge.
+                deleted = old_read.filter(pk__in=ids)._raw_delete(old_read.db)
+                if deleted < len(ids):
+                    kept = Notification.objects.filter(pk__in=ids).values_list('pk', flat=True)
+                    NotificationArchive.objects.filter(original_id__in=list(kept)).delete()
+            archived += deleted
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} read notifications older than {cutoff:%Y-%m-%d}."
+        ))
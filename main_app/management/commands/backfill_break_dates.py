@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+
+from main_app.models import Break
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill Break.date from break_start for breaks saved before the column "
+        "existed. Runs in primary-key batches so each transaction stays short; "
+        "safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be >= 1.")
+
+        last_id = Break.objects.aggregate(last=Max('pk'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id, batch_size):
+            updated += Break.objects.filter(
+                pk__gt=start, pk__lte=start + batch_size, date__isnull=True
+            ).update(date=TruncDate('break_start'))
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled the date of {updated} breaks."))
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, DurationField, Exists, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from main_app.models import AttendanceRecord, Break
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the break aggregates stored on AttendanceRecord (total break "
+        "time, break count, lunch taken, open break) from the Break table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        breaks = Break.objects.filter(attendance_record=OuterRef('pk')).order_by().values('attendance_record')
+        totals = {
+            'total_break_time': Coalesce(
+                Subquery(breaks.annotate(total=Sum('duration')).values('total')),
+                Value(timedelta()), output_field=DurationField(),
+            ),
+            'break_count': Coalesce(
+                Subquery(breaks.annotate(total=Count('pk')).values('total')),
+                Value(0), output_field=IntegerField(),
+            ),
+            'lunch_taken': Exists(breaks.filter(break_type='lunch')),
+            'open_break': Subquery(
+                Break.objects.filter(attendance_record=OuterRef('pk'), break_end__isnull=True)
+                .order_by('-break_start').values('pk')[:1]
+            ),
+        }
+
+        last_id = AttendanceRecord.objects.aggregate(last=Max('pk'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id, options['batch_size']):
+            updated += AttendanceRecord.objects.filter(
+                pk__gt=start, pk__lte=start + options['batch_size']
+            ).update(**totals)
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed break totals for {updated} attendance records."))
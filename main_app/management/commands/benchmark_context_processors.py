@@ -0,0 +1,68 @@
+from copy import deepcopy
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from main_app.models import CustomUser
+from main_app.utils.request_profile import get_request_profile
+
+
+DEFAULT_TEMPLATES = [
+    'manager_template/partials/breaks_table.html',
+    'ceo_template/attendance_report_pdf.html',
+    'main_app/base.html',
+]
+
+
+def build_engine(lazy):
+    """Template engine using the configured processors, or their eager originals."""
+    config = deepcopy(settings.TEMPLATES[0])
+    processors = config['OPTIONS']['context_processors']
+    if not lazy:
+        processors = [path.replace('context_processors.lazy_', 'context_processors.') for path in processors]
+    config['OPTIONS']['context_processors'] = processors
+    config['NAME'] = 'lazy' if lazy else 'eager'
+    return DjangoTemplates(config)
+
+
+class Command(BaseCommand):
+    help = "Compare per-render query counts of the eager and lazy context processors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('templates', nargs='*', default=DEFAULT_TEMPLATES)
+        parser.add_argument('--email', help="Render as this user (defaults to the first active user).")
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.filter(is_active=True)
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No matching active user to render as.")
+
+        engines = {'eager': build_engine(lazy=False), 'lazy': build_engine(lazy=True)}
+        factory = RequestFactory()
+
+        self.stdout.write(f"Rendering as {user.email} (user_type={user.user_type})")
+        self.stdout.write(f"{'template':<50} {'eager':>7} {'lazy':>7}")
+        for template_name in options['templates']:
+            counts = {}
+            for label, engine in engines.items():
+                cache.clear()
+                request = factory.get('/')
+                request.user = user
+                request.profile = get_request_profile(request)
+                try:
+                    template = engine.get_template(template_name)
+                    with CaptureQueriesContext(connection) as queries:
+                        template.render({}, request)
+                    counts[label] = str(len(queries))
+                except Exception as e:
+                    counts[label] = 'error'
+                    self.stderr.write(f"{template_name} ({label}): {e}")
+            self.stdout.write(f"{template_name:<50} {counts['eager']:>7} {counts['lazy']:>7}")
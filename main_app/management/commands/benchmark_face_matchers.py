@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.utils.face_matchers import BruteForceMatcher, IVFMatcher
+from main_app.utils.face_preprocess import face_recognition_config
+
+
+# Per-dimension spread of synthetic people (about 0.9 apart, like distinct
+# faces) and of a person's repeat captures (about 0.25 from their enrolment)
+PERSON_SPREAD = 0.08
+CAPTURE_NOISE = 0.02
+
+
+def synthetic_gallery(size, rng):
+    """Float32 face-like encodings: people drawn around a few hundred look-alike groups."""
+    groups = rng.normal(0, PERSON_SPREAD * 2, (min(size, 500), 128))
+    people = groups[rng.integers(len(groups), size=size)] + rng.normal(0, PERSON_SPREAD / 2, (size, 128))
+    return people.astype(np.float32)
+
+
+def time_searches(matcher, queries, tolerance):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(matcher.search(query, tolerance))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the brute-force and IVF face matchers on synthetic 128-d "
+        "galleries: build time, query latency and recall against the exact search."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--lists', type=int, help="IVF cells (default: square root of the gallery size).")
+        parser.add_argument('--probe', type=int, nargs='+', default=[4, 8, 16], help="IVF cells searched per query.")
+        parser.add_argument('--tolerance', type=float, help="Match tolerance (default: FACE_RECOGNITION setting).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options['sizes']) < 1 or options['queries'] < 1:
+            raise CommandError("--sizes and --queries must be positive.")
+        tolerance = options['tolerance'] or face_recognition_config()['tolerance']
+        rng = np.random.default_rng(options['seed'])
+
+        self.stdout.write(f"Tolerance {tolerance}, {options['queries']} queries per gallery")
+        self.stdout.write(
+            f"{'size':>7} {'matcher':<14} {'build ms':>9} {'mean ms':>8} {'p95 ms':>8} {'recall':>7}"
+        )
+        for size in options['sizes']:
+            gallery = synthetic_gallery(size, rng)
+            # Queries are fresh captures of enrolled people
+            enrolled = rng.integers(size, size=options['queries'])
+            queries = gallery[enrolled] + rng.normal(0, CAPTURE_NOISE, (options['queries'], 128)).astype(np.float32)
+
+            exact, latencies = time_searches(BruteForceMatcher(gallery), queries, tolerance)
+            expected = [found[0] if found else None for found in exact]
+            self.report(size, 'brute_force', 0.0, latencies, 1.0)
+
+            for probe in options['probe']:
+                start = time.perf_counter()
+                matcher = IVFMatcher(gallery, n_lists=options['lists'], n_probe=probe, seed=options['seed'])
+                build_ms = (time.perf_counter() - start) * 1000
+                found, latencies = time_searches(matcher, queries, tolerance)
+                hits = sum(
+                    (result[0] if result else None) == want
+                    for result, want in zip(found, expected)
+                )
+                label = f"ivf {matcher.n_lists}/{matcher.n_probe}"
+                self.report(size, label, build_ms, latencies, hits / len(expected))
+
+    def report(self, size, label, build_ms, latencies, recall):
+        self.stdout.write(
+            f"{size:>7} {label:<14} {build_ms:>9.1f} {latencies.mean():>8.3f} "
+            f"{np.percentile(latencies, 95):>8.3f} {recall:>7.3f}"
+        )
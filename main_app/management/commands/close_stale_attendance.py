@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, DateTimeField, DurationField, ExpressionWrapper, F, Q, TextField, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from main_app.models import AttendanceRecord
+from main_app.utils.attendance_state import invalidate_attendance_state
+
+
+REGULAR_HOURS_LIMIT = timedelta(hours=8)
+# Worked time credited to a forgotten clock-out
+AUTO_CLOCKOUT_DURATIONS = [
+    (Q(status='half_day'), timedelta(hours=4, minutes=30)),
+    (~Q(status='half_day'), timedelta(hours=8)),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Close attendance records left open on previous days, crediting 8 hours "
+        "(4h30 for half days). Schedule it nightly."
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        today = now.date()
+        stale = AttendanceRecord.objects.filter(
+            clock_out__isnull=True, clock_in__isnull=False, date__lt=today
+        )
+        note = f"Auto-logged out on {today} due to missed clock-out"
+
+        with transaction.atomic():
+            user_ids = set(stale.values_list('user_id', flat=True))
+            closed = 0
+            for status_filter, duration in AUTO_CLOCKOUT_DURATIONS:
+                closed += stale.filter(status_filter).update(
+                    clock_out=ExpressionWrapper(F('clock_in') + Value(duration), output_field=DateTimeField()),
+                    total_worked=Value(duration, output_field=DurationField()),
+                    regular_hours=Value(min(duration, REGULAR_HOURS_LIMIT), output_field=DurationField()),
+                    overtime_hours=Value(max(timedelta(), duration - REGULAR_HOURS_LIMIT), output_field=DurationField()),
+                    notes=Concat(
+                        Case(
+                            When(Q(notes__isnull=True) | Q(notes=''), then=Value('')),
+                            default=Concat(F('notes'), Value('\n')),
+                            output_field=TextField(),
+                        ),
+                        Value(note),
+                        output_field=TextField(),
+                    ),
+                    updated_at=now,
+                )
+            # update() skips the signals that invalidate the header clock state
+            invalidate_attendance_state(user_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Closed {closed} stale attendance records."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.authentication import create_api_token
+from main_app.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Create an API token for a user or device. The token is printed once; "
+        "only its digest is stored. Revoke it by unticking is_active in the admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help="Email of the user the token acts as.")
+        parser.add_argument('--name', required=True, help="Device or integration using the token.")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}.")
+        token, plain = create_api_token(user, options['name'])
+        self.stdout.write(self.style.SUCCESS(f"Created token '{token.name}' for {user.email}:"))
+        self.stdout.write(plain)
@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from main_app.models import ClockEvent, CustomUser
+from main_app.utils.clock_events import enqueue_clock_event, process_pending_events
+
+
+EMAIL_TEMPLATE = 'loadtest-{}@clock-events.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the clock-in queue: enqueue one clock-in per synthetic user "
+        "from concurrent threads, drain the queue and report throughput. "
+        "Run it against a copy of the database; the synthetic users are "
+        "deleted afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        if CustomUser.objects.filter(email__startswith='loadtest-').exists():
+            raise CommandError("Load test users already exist; remove them first.")
+
+        # Second-shift users skip the 8:45 cut-off, so the test can run at any hour
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                email=EMAIL_TEMPLATE.format(i), user_type='3', is_second_shift=True,
+                first_name='Load', last_name=f'Test {i}',
+            )
+            for i in range(options['users'])
+        ])
+        user_ids = list(
+            CustomUser.objects.filter(email__startswith='loadtest-').values_list('id', flat=True)
+        )
+
+        def enqueue(user_id):
+            try:
+                enqueue_clock_event(user_id, 'clock_in', timezone.now(), ip_address='127.0.0.1')
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                list(pool.map(enqueue, user_ids))
+            enqueue_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            while process_pending_events(options['batch_size']):
+                pass
+            apply_seconds = time.perf_counter() - started
+
+            events = ClockEvent.objects.filter(user_id__in=user_ids)
+            applied = events.filter(status='applied').count()
+            rejected = events.filter(status='rejected').count()
+            count = len(user_ids)
+            self.stdout.write(
+                f"Enqueued {count} clock-ins from {options['threads']} threads in {enqueue_seconds:.2f}s "
+                f"({count / enqueue_seconds * 60:.0f}/min)."
+            )
+            self.stdout.write(
+                f"Applied {applied} (rejected {rejected}) in {apply_seconds:.2f}s "
+                f"({count / apply_seconds * 60:.0f}/min)."
+            )
+        finally:
+            if not options['keep']:
+                CustomUser.objects.filter(id__in=user_ids).delete()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.utils.clock_events import process_pending_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply queued clock events (ATTENDANCE_CLOCK_QUEUE) in batches. Runs until "
+        "stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--interval', type=float, default=0.5, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = process_pending_events(options['batch_size'])
+                total += processed
+                if processed:
+                    self.stdout.write(f"Applied a batch of {processed} clock events.")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} clock events."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main_app.utils.face_index import face_index_dir, write_face_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a fresh face encoding snapshot to FACE_INDEX_DIR. Enrolment keeps "
+        "it current; run this after restoring the database or moving hosts."
+    )
+
+    def handle(self, *args, **options):
+        version = write_face_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"Wrote face index version {version} to {face_index_dir()}."))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from main_app.models import Notification, NotificationCounter
+from main_app.utils.notification_cache import bump_notification_version
+
+
+def expected_counters():
+    """Unread counts recomputed from the Notification table."""
+    rows = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id', 'role', 'notification_type')
+        .annotate(unread=Count('pk'))
+    )
+    return {
+        (row['user_id'], row['role'], row['notification_type']): row['unread']
+        for row in rows
+    }
+
+
+def stored_counters():
+    return {
+        (user_id, role, notification_type): unread
+        for user_id, role, notification_type, unread in NotificationCounter.objects.values_list(
+            'user_id', 'role', 'notification_type', 'unread'
+        )
+        if unread
+    }
+
+
+class Command(BaseCommand):
+    help = "Rebuild the NotificationCounter table from Notification rows and verify it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help="Only compare the counters with the notifications, do not rebuild.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            with transaction.atomic():
+                previous = stored_counters()
+                rebuilt = expected_counters()
+                NotificationCounter.objects.all().delete()
+                NotificationCounter.objects.bulk_create([
+                    NotificationCounter(user_id=user_id, role=role, notification_type=notification_type, unread=unread)
+                    for (user_id, role, notification_type), unread in rebuilt.items()
+                ], batch_size=500)
+            # Cached badge counts were computed from the old counters
+            bump_notification_version([key[0] for key in set(previous) | set(rebuilt)], asset=True)
+            self.stdout.write("Notification counters rebuilt.")
+
+        expected = expected_counters()
+        stored = stored_counters()
+        mismatches = [
+            (key, expected.get(key, 0), stored.get(key, 0))
+            for key in sorted(set(expected) | set(stored), key=str)
+            if expected.get(key, 0) != stored.get(key, 0)
+        ]
+        for (user_id, role, notification_type), want, got in mismatches:
+            self.stderr.write(
+                f"user={user_id} role={role} type={notification_type}: expected {want}, counter {got}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} notification counters are out of date.")
+        self.stdout.write(self.style.SUCCESS(f"{len(expected)} notification counters verified."))
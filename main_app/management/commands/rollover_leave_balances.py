@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main_app.models import AttendanceRecord, Employee, LeaveBalance
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly LeaveBalance rows up to the current month for every "
+        "employee who has clocked in. Schedule it on the 1st of each month."
+    )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        clocked_in_users = AttendanceRecord.objects.filter(
+            status__in=['present', 'late', 'half_day']
+        ).values('user_id')
+        employees = Employee.objects.filter(
+            admin_id__in=clocked_in_users,
+            date_of_joining__isnull=False,
+        )
+
+        count = 0
+        for employee in employees.iterator():
+            LeaveBalance.initialize_balances(employee, today)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Leave balances initialized up to {today:%Y-%m} for {count} employees."
+        ))
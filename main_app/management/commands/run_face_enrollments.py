@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from main_app.models import FaceEnrollmentJob
+from main_app.utils.face_enrollment import run_enrollment_job
+from main_app.utils.face_index import batched_face_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode queued face enrollment jobs in this process, e.g. jobs left "
+        "behind when a web worker restarted, or a large bulk enrollment."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue-running', action='store_true',
+            help="Also retry jobs stuck in 'running' because their worker died.",
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            FaceEnrollmentJob.objects.filter(status='running').update(status='queued')
+
+        job_ids = list(FaceEnrollmentJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True))
+        # One snapshot for the whole pass rather than one per enrolled face
+        with batched_face_snapshot():
+            for job_id in job_ids:
+                run_enrollment_job(job_id)
+
+        done = FaceEnrollmentJob.objects.filter(pk__in=job_ids, status='done').count()
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(job_ids)} enrollment jobs, {done} enrolled."))
@@ -25,6 +25,7 @@ import logging
 from django.utils.text import get_valid_filename
 from django.contrib.auth import get_user_model 
 from .utils.email_utils import send_emails_in_background
+from .utils.idempotency import idempotent
 
 
 LOCATION_CHOICES = (
@@ -44,7 +45,7 @@ def make_aware_if_naive(dt):
 @login_required   
 def manager_home(request):
     try:
-        manager = get_object_or_404(Manager, admin=request.user)
+        manager = request.profile.manager_or_404()
         manager_department = manager.department.name.lower().strip()
         today = date.today()
         current_time = timezone.now()
@@ -85,7 +86,7 @@ def manager_home(request):
         
         on_break_now = Break.objects.filter(
             attendance_record__user__in=employee_ids,
-            break_start__date=today,
+            date=today,
             break_start__lte=current_time,
         ).filter(models.Q(break_end__isnull=True) | models.Q(break_end__gte=current_time)).distinct()
 
@@ -115,7 +116,7 @@ def manager_home(request):
         
             emp_breaks = Break.objects.filter(
                 attendance_record__user=employee,
-                break_start__date=today
+                date=today
             ).order_by('-break_start')  # Changed to descending order
 
             for b in emp_breaks:
@@ -145,19 +146,14 @@ def manager_home(request):
                 })
 
             # current record
-            current_record = AttendanceRecord.objects.filter(
+            current_record = AttendanceRecord.objects.select_related('open_break').filter(
                 user=request.user,
                 clock_out__isnull=True,
                 date=today
             ).first()
 
             # for break start end
-            current_break = None
-            if current_record:
-                current_break = Break.objects.filter(
-                    attendance_record=current_record,
-                    break_end__isnull=True
-                ).first()
+            current_break = current_record.open_break if current_record else None
 
         # Sort break entries by break_start in descending order (newest first)
         if break_entries:
@@ -223,7 +219,7 @@ logger = logging.getLogger(__name__)
 
 @login_required
 def manager_leave_balance(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     today = get_ist_date()
     current_year = today.year
     current_month = today.month
@@ -317,7 +313,7 @@ def manager_leave_balance(request):
 
 @login_required
 def manager_todays_attendance(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     today = timezone.now()
     
     # if manager.department.name.strip().lower() in ['hr','h r']:
@@ -355,7 +351,7 @@ def manager_todays_attendance(request):
 
 @login_required   
 def manager_take_attendance(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     print("manager",manager)
     departments = Department.objects.filter(division=manager.division)
     context = {
@@ -1382,7 +1378,7 @@ def manager_apply_leave(request):
 
 @login_required   
 def manage_employee_by_manager(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     search_ = request.GET.get("search", '').strip()
     gender = request.GET.get("gender", '')
     department_id = request.GET.get("department", '')
@@ -1537,6 +1533,7 @@ def get_assigned_assets(request):
 @login_required   
 @csrf_exempt
 @require_POST
+@idempotent
 def assign_assets(request):
     try:
         data = json.loads(request.body)
@@ -1737,7 +1734,7 @@ def remove_all_asset_assignment(request):
 @login_required   
 def add_employee_by_manager(request):
     # Only managers can add employees to their department
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
 
     # Form to add a new employee
     employee_form = EmployeeForm(request.POST or None, request.FILES or None)
@@ -2073,6 +2070,7 @@ def manager_send_employee_notification(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def send_bulk_employee_notification_by_manager(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -2103,6 +2101,7 @@ def send_bulk_employee_notification_by_manager(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def send_selected_employee_notification_by_manager(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -2142,7 +2141,7 @@ logger = logging.getLogger(__name__)
 
 @login_required
 def manager_view_profile(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     form = ManagerEditForm(request.POST or None, request.FILES or None, instance=manager)
     context = {'form': form, 'page_title': 'View/Update Profile', 'user_object': manager.admin}
     
@@ -2237,7 +2236,7 @@ def manager_fcmtoken(request):
 
 @login_required   
 def manager_view_notification(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     manager_department = manager.department.name.lower().strip()
 
     # notification from admin
@@ -2454,7 +2453,7 @@ def manager_view_by_employee_leave(request):
 
 @login_required   
 def manager_asset_view_notification(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     manager_department = manager.department.name.lower().strip()
 
     if manager_department in ['hr','h r']:
@@ -2744,7 +2743,7 @@ def reject_leave_request(request, leave_id):
 
 @login_required   
 def manager_add_salary(request):
-    manager = get_object_or_404(Manager, admin=request.user)
+    manager = request.profile.manager_or_404()
     departments = Department.objects.filter(division=manager.division)
     context = {
         'page_title': 'Salary Upload',
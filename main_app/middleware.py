@@ -1,73 +1,109 @@
+from functools import cached_property
+from types import MappingProxyType
+
 from django.utils.deprecation import MiddlewareMixin
-from django.urls import reverse,resolve
+from django.urls import reverse
 from django.shortcuts import redirect
 from django.shortcuts import render
+from .utils.request_profile import get_request_profile
+
+
+class RequestProfileMiddleware:
+    """Attach the lazily loaded RequestProfile shared by views and context processors."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = get_request_profile(request)
+        return self.get_response(request)
+
+
+# Route permission table. Views are matched by their resolved view name first
+# and by the module they live in second; anything not listed is open to every
+# authenticated user.
+ALL_USER_TYPES = frozenset({'1', '2', '3'})
+STAFF = frozenset({'1', '2'})
+
+VIEW_NAME_ACCESS = MappingProxyType({
+    'asset_app:assets-list': STAFF,
+    'asset_app:assetscategory-create': STAFF,
+    'asset_app:assets-detail': ALL_USER_TYPES,
+    'asset_app:assets-create': STAFF,
+    'asset_app:asset-assign': STAFF,
+    'asset_app:asset-claim': ALL_USER_TYPES,
+    'asset_app:approve-notification': STAFF,
+    'asset_app:get_category_config': STAFF,
+    'asset_app:asset-unclaim': STAFF,
+    'asset_app:asset-update': STAFF,
+    'asset_app:asset-delete': STAFF,
+    'asset_app:assetcategory-update': STAFF,
+    'asset_app:not-assign-asset-list': ALL_USER_TYPES,
+    'asset_app:my-assets': ALL_USER_TYPES,
+    'asset_app:print_all_barcode': STAFF,
+    'asset_app:assetcategory-delete': STAFF,
+})
+
+MODULE_ACCESS = MappingProxyType({
+    'main_app.ceo_views': frozenset({'1'}),
+    'main_app.manager_views': STAFF,
+    'main_app.employee_views': frozenset({'3'}),
+})
+
+HOME_URL_NAMES = MappingProxyType({
+    '1': 'admin_home',
+    '2': 'manager_home',
+    '3': 'employee_home',
+})
+
+# Reachable by anyone, signed in or not (kiosk camera)
+OPEN_URL_NAMES = ('open_camera', 'recognize_face')
+# Reachable without signing in (the API views authenticate themselves)
+ANONYMOUS_URL_NAMES = ('login_page', 'user_login', 'clock_in_out_api', 'clock_event_sync_api')
+ANONYMOUS_MODULES = frozenset({'django.contrib.auth.views'})
 
 
 class LoginCheckMiddleWare(MiddlewareMixin):
+    """
+    Login and role checks for every view, driven by the tables above.
+
+    URLs are reversed once per process and the view is identified through
+    request.resolver_match, so no URL resolution happens per request.
+    """
+
+    @cached_property
+    def urls(self):
+        return MappingProxyType({
+            'login': reverse('login_page'),
+            'open': frozenset(reverse(name) for name in OPEN_URL_NAMES),
+            'anonymous': frozenset(reverse(name) for name in ANONYMOUS_URL_NAMES),
+            'home': MappingProxyType({
+                user_type: reverse(name) for user_type, name in HOME_URL_NAMES.items()
+            }),
+        })
+
     def process_view(self, request, view_func, view_args, view_kwargs):
-        modulename = view_func.__module__
-        user = request.user # Who is the current user ?
-
-        if request.path == reverse('open_camera') or request.path == reverse('recognize_face'):
-            return None # allow access 
-        
-        if user.is_authenticated:
-            if user.user_type == '1': # Is it the CEO/Admin
-                if modulename == 'main_app.employee_views':
-                    return redirect(reverse('admin_home'))
-            elif user.user_type == '2': #  Manager :-/ ?
-                if modulename == 'main_app.employee_views' or modulename == 'main_app.ceo_views':
-                    return redirect(reverse('manager_home'))
-            elif user.user_type == '3': # ... or Employee ?
-                if modulename == 'main_app.ceo_views' or modulename == 'main_app.manager_views':
-                    return redirect(reverse('employee_home'))
-            else: # None of the aforementioned ? Please take the user to login page
-                return redirect(reverse('login_page'))
-        else:
-            if request.path == reverse('clock_in_out_api') or request.path == reverse('login_page') or modulename == 'django.contrib.auth.views' or request.path == reverse('user_login') : # If the path is login or has anything to do with authentication, pass
-                pass
-            else:
-                return redirect(reverse('login_page'))
-
-
-class RoleBasedAccessMiddleware:
-    def __init__(self,get_response):
-        self.get_response = get_response
+        urls = self.urls
+        if request.path in urls['open']:
+            return None
 
-        self.asset_urls = {
-            'asset_app:assets-list' : ['1','2'],
-            'asset_app:assetscategory-create': ['1','2'],
-            'asset_app:assets-detail' : ['1','2','3'],
-            'asset_app:assets-create' : ['1','2'],
-            'asset_app:asset-assign' : ['1','2'],
-            'asset_app:asset-claim' : ['1','2','3'],
-            'asset_app:approve-notification' : ['1','2'],
-            'asset_app:get_category_config' : ['1','2'],
-            'asset_app:asset-unclaim' : ['1','2'],
-            'asset_app:asset-update' : ['1','2'],
-            'asset_app:asset-delete' : ['1','2'],
-            'asset_app:assetcategory-update' : ['1','2'],
-            'asset_app:not-assign-asset-list' : ['1','2','3'],
-            'asset_app:my-assets' : ['1','2','3'],
-            'asset_app:print_all_barcode' : ['1','2'],
-            'asset_app:assetcategory-delete' : ['1','2'],
-        }
-
-    def __call__(self,request):
-        path = request.path
         user = request.user
+        modulename = view_func.__module__
+        if not user.is_authenticated:
+            if request.path in urls['anonymous'] or modulename in ANONYMOUS_MODULES:
+                return None
+            return redirect(urls['login'])
 
-        try:
-            resolved = resolve(request.path_info)
-            current_usrl_name = resolved.view_name
-        except Exception:
-            return self.get_response(request)
-        
-        if current_usrl_name in self.asset_urls:
-            allowed_user_type = self.asset_urls[current_usrl_name]
-            if str(user.user_type) not in allowed_user_type:
-                return render(request,'main_app/403.html',status=403)
-
-        return self.get_response(request)
+        user_type = str(user.user_type)
+        match = request.resolver_match
+        allowed = VIEW_NAME_ACCESS.get(match.view_name) if match else None
+        if allowed is not None:
+            if user_type not in allowed:
+                return render(request, 'main_app/403.html', status=403)
+            return None
 
+        if user_type not in urls['home']:
+            return redirect(urls['login'])
+        allowed = MODULE_ACCESS.get(modulename, ALL_USER_TYPES)
+        if user_type not in allowed:
+            return redirect(urls['home'][user_type])
+        return None
@@ -9,11 +9,13 @@ from datetime import timedelta
 import pytz
 from datetime import datetime, time,date
 from calendar import monthrange
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q, Count, Case, When, Value, Exists, OuterRef
 import logging
 import face_recognition
-import numpy as np
 from django.core.cache import caches
+from .utils.notification_cache import bump_notification_version
+from .utils.versioned_cache import get_version
 cache = caches['default']
 
 
@@ -404,6 +406,11 @@ class Employee(models.Model):
 
 
 
+LEAVE_BALANCE_VERSION_KEY = 'leave_balance_version:{}'
+LEAVE_BALANCE_SUMMARY_KEY = 'leave_balance_summary:{}:{}:{}:{}'
+LEAVE_BALANCE_SUMMARY_TIMEOUT = 60 * 60 * 24
+
+
 class LeaveBalance(models.Model):
     employee = models.ForeignKey('Employee', on_delete=models.CASCADE, related_name='leave_balances')
     year = models.PositiveIntegerField()
@@ -501,18 +508,56 @@ class LeaveBalance(models.Model):
 
     @classmethod
     def initialize_balances(cls, employee, end_date):
+        """Create the missing monthly balances from the joining month up to end_date."""
         joining_date = employee.date_of_joining
         current_date = joining_date
         end_year = end_date.year
         end_month = end_date.month
+        existing = set(cls.objects.filter(employee=employee).values_list('year', 'month'))
 
         while current_date.year < end_year or (current_date.year == end_year and current_date.month <= end_month):
-            cls.create_balance(employee, current_date.year, current_date.month)
+            if (current_date.year, current_date.month) not in existing:
+                cls.create_balance(employee, current_date.year, current_date.month)
             if current_date.month == 12:
                 current_date = current_date.replace(year=current_date.year + 1, month=1, day=1)
             else:
                 current_date = current_date.replace(month=current_date.month + 1, day=1)
 
+    @classmethod
+    def get_yearly_summary(cls, employee, today):
+        """
+        Monthly balances of the current year and the leaves available this
+        month, read with one query and cached until a balance changes.
+        """
+        version = get_version(LEAVE_BALANCE_VERSION_KEY.format(employee.pk))
+        key = LEAVE_BALANCE_SUMMARY_KEY.format(employee.pk, today.year, today.month, version)
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+        balances = {
+            balance.month: balance
+            for balance in cls.objects.filter(employee=employee, year=today.year)
+        }
+        yearly_leave_data = []
+        for month in range(1, 13):
+            balance = balances.get(month)
+            yearly_leave_data.append({
+                'month': month,
+                'allocated_leaves': balance.allocated_leaves if balance else 0.0,
+                'carried_forward': balance.carried_forward if balance else 0.0,
+                'used_leaves': balance.used_leaves if balance else 0.0,
+                'available_leaves': balance.total_available_leaves() if balance else 0.0,
+            })
+
+        current_balance = balances.get(today.month)
+        summary = {
+            'yearly_leave_data': yearly_leave_data,
+            'total_available_leaves': current_balance.total_available_leaves() if current_balance else 0.0,
+        }
+        cache.set(key, summary, LEAVE_BALANCE_SUMMARY_TIMEOUT)
+        return summary
+
     @classmethod
     def deduct_leave(cls, employee, date, leave_type):
         balance = cls.get_balance(employee, date.year, date.month)
@@ -578,42 +623,52 @@ class FaceProfile(models.Model):
         return self.employee.first_name + " " + self.employee.last_name
 
     def save(self,*args,**kwargs):
-        # auto encode face when saving
-        super().save(*args,**kwargs)
-
+        # auto encode face when saving; encoded once, before the single write
         if self.face_image and not self.face_encoding:
-            self.encode_face()
-            cache.delete('face_encodings')
-            cache.delete('face_users')
-
+            self.face_encoding = self.encode_face()
+        super().save(*args,**kwargs)
 
     def encode_face(self):
-        # convert uploaded face_image to encoding and save
+        """Return the encoding of face_image as bytes, or None if no face is found."""
         try:
-            image = face_recognition.load_image_file(self.face_image.path)
+            self.face_image.open('rb')
+            image = face_recognition.load_image_file(self.face_image)
             encodings = face_recognition.face_encodings(image)
-
             if encodings:
-                self.face_encoding = encodings[0].tobytes() # store as binary
-                self.save()
+                return encodings[0].tobytes() # store as binary
         except Exception as e:
             print(f"Face encoding failed: {e}")
+        finally:
+            self.face_image.seek(0)
+        return None
 
-    @classmethod
-    def get_all_encodings(cls):
-        profiles = cls.objects.select_related('employee').all()
-        encodings = []
-        users = [] 
-
-        for profile in profiles:
-            if profile.face_encoding:
-                encodings.append(np.frombuffer(profile.face_encoding, dtype=np.float64))
-                users.append({
-                    'id': profile.employee.id,
-                    'name': profile.employee.get_full_name(),
-                    'email': profile.employee.email
-                })
-        return encodings, users
+
+class FaceEnrollmentJob(models.Model):
+    """A face photo waiting to be encoded into its user's FaceProfile (see utils.face_enrollment)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    employee = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='face_enrollment_jobs')
+    face_image = models.ImageField(upload_to="face_profiles/")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True, default='')
+    requested_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Face enrollment of {self.employee} ({self.status})"
 
 
 class AttendanceRecord(models.Model):
@@ -640,12 +695,34 @@ class AttendanceRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     clock_in_type = models.CharField(blank=True,null=True,default="manual")
+    # Break aggregates, kept up to date by Break.save() and the Break delete signal.
+    # save() leaves them out unless they are named in update_fields.
+    BREAK_AGGREGATE_FIELDS = ('total_break_time', 'break_count', 'lunch_taken', 'open_break')
+    total_break_time = models.DurationField(default=timedelta)
+    break_count = models.PositiveIntegerField(default=0)
+    lunch_taken = models.BooleanField(default=False)
+    open_break = models.ForeignKey('Break', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
     def __str__(self):   
         return f"{self.user} - {self.date}"
 
+    @property
+    def net_worked(self):
+        """Worked time minus breaks, or None while the record is open."""
+        if self.total_worked is None:
+            return None
+        return self.total_worked - self.total_break_time
+
     class Meta:
         unique_together = [['user', 'date' , 'clock_in']]
+        constraints = [
+            # A user can only have one open (not clocked out) record per day
+            models.UniqueConstraint(
+                fields=['user', 'date'],
+                condition=Q(clock_out__isnull=True),
+                name='one_open_attendance_per_day',
+            ),
+        ]
         indexes = [
             models.Index(fields=['user', 'date']),
             models.Index(fields=['date', 'department']),
@@ -661,36 +738,7 @@ class AttendanceRecord(models.Model):
             raise ValidationError("Clock out time must be on the same date as the attendance record.")
 
     def save(self, *args, **kwargs):
-        # Auto-close previous records with 8 hours for normal days and 4.5 hours for half_day
-        if not self.pk and self.status not in ['leave' , 'half_day']:
-            open_records = AttendanceRecord.objects.filter(
-                user = self.user,
-                clock_out__isnull = True,
-                date__lt = self.date
-            )
-
-            for record in open_records:
-                if record.clock_in:
-                    if record.status == 'half_day':
-                        auto_clockout_duration = timedelta(hours=4 , minutes=30)
-                    else:
-                        auto_clockout_duration = timedelta(hours=8)
-
-                    record.clock_out = record.clock_in + auto_clockout_duration
-                    record.notes = (
-                        f"{record.notes}\n" if record.notes else ""
-                    ) + f"Auto-logged out on {timezone.now().date()} due to new record creation"
-
-                    record.total_worked = record.clock_out - record.clock_in
-                    regular_hours_limit = timedelta(hours=8)
-                    if record.total_worked > regular_hours_limit:
-                        record.regular_hours = regular_hours_limit
-                        record.overtime_hours = record.total_worked - regular_hours_limit
-                    else:
-                        record.regular_hours = record.total_worked
-                        record.overtime_hours = timedelta()
-                    record.save()
-
+        # Open records from previous days are closed by the close_stale_attendance command
         # only apply late/half-day logic for non-second-shift user
         if self.clock_in and not self.user.is_second_shift:
             late_time = datetime.combine(self.clock_in.date(), time(9, 30))
@@ -711,6 +759,13 @@ class AttendanceRecord(models.Model):
             self.regular_hours = min(self.total_worked, regular_hours_limit)
             self.overtime_hours = max(timedelta(), self.total_worked - regular_hours_limit)
 
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Break.save() updates the aggregates in the database only, so this
+            # copy may hold stale values; a full save must not write them back
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.BREAK_AGGREGATE_FIELDS
+            ]
         super().save(*args, **kwargs)
 
 
@@ -791,16 +846,172 @@ class EmployeeSalary(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+# Notification.role / notification_type values. Kept as short coded strings
+# (rather than integers) so existing filters and templates keep working.
+NOTIFICATION_ROLE_CHOICES = [
+    ('ceo', 'CEO'),
+    ('admin', 'Admin'),
+    ('manager', 'Manager'),
+    ('employee', 'Employee'),
+]
+
+NOTIFICATION_TYPE_CHOICES = [
+    ('general-notification', 'General notification'),
+    ('notification-from-admin', 'Notification from admin'),
+    ('notification-from-manager', 'Notification from manager'),
+    ('leave-notification', 'Leave'),
+    ('manager-leave-notification', 'Manager leave'),
+    ('employee-leave-notification', 'Employee leave'),
+    ('clockout-notification', 'Early clock-out'),
+    ('asset-notification', 'Asset'),
+    ('asset_request', 'Asset request'),
+    ('asset_issue', 'Asset issue'),
+    ('employee feedback', 'Employee feedback'),
+    ('leave', 'Leave (legacy)'),
+    ('notification', 'Notification (legacy)'),
+]
+
+
+class NotificationCounter(models.Model):
+    """Unread notification count per (user, role, notification_type), kept in step with Notification."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='notification_counters')
+    role = models.CharField(max_length=16, choices=NOTIFICATION_ROLE_CHOICES)
+    notification_type = models.CharField(max_length=40, choices=NOTIFICATION_TYPE_CHOICES)
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['user', 'role', 'notification_type']]
+        indexes = [
+            models.Index(fields=['role', 'notification_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.notification_type} - {self.role}: {self.unread}"
+
+    @classmethod
+    def adjust(cls, user_id, role, notification_type, delta):
+        """Atomically add delta to a counter, creating it on first use."""
+        counter = cls.objects.filter(user_id=user_id, role=role, notification_type=notification_type)
+        if counter.update(unread=F('unread') + delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=user_id, role=role,
+                    notification_type=notification_type, unread=max(delta, 0)
+                )
+        except IntegrityError:
+            # Created concurrently, apply the change to that row instead
+            counter.update(unread=F('unread') + delta)
+
+
+class NotificationQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        with transaction.atomic():
+            affected = list(self.values_list('user_id', 'notification_type').distinct())
+            changed = []
+            if 'is_read' in kwargs:
+                # Groups whose unread count this update changes
+                changed = list(
+                    self.exclude(is_read=kwargs['is_read'])
+                    .values('user_id', 'role', 'notification_type')
+                    .annotate(total=Count('pk'))
+                )
+            updated = super().update(**kwargs)
+            delta = -1 if kwargs.get('is_read') else 1
+            for group in changed:
+                NotificationCounter.adjust(
+                    group['user_id'], group['role'], group['notification_type'], delta * group['total']
+                )
+
+        # Bulk updates skip post_save, so invalidate the affected badge counts here
+        if updated:
+            bump_notification_version(
+                [user_id for user_id, _ in affected],
+                asset=any(notification_type == 'asset-notification' for _, notification_type in affected)
+            )
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            for notification in objs:
+                if not notification.is_read:
+                    NotificationCounter.adjust(notification.user_id, notification.role, notification.notification_type, 1)
+        bump_notification_version(
+            [notification.user_id for notification in objs],
+            asset=any(notification.notification_type == 'asset-notification' for notification in objs)
+        )
+        return objs
+
+
 class Notification(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
-    role = models.CharField(max_length=56)
+    role = models.CharField(max_length=16, choices=NOTIFICATION_ROLE_CHOICES)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
-    notification_type = models.TextField()
+    notification_type = models.CharField(max_length=40, choices=NOTIFICATION_TYPE_CHOICES)
     timestamp = models.DateTimeField(auto_now_add=True)
     leave_or_notification_id = models.IntegerField()
+
+    objects = NotificationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-user lists and mark-as-read filters
+            models.Index(fields=['user', 'is_read', 'notification_type', 'role'], name='notif_user_read_type_role'),
+            # Unread lookups only need the (small) unread part of the table
+            models.Index(
+                fields=['user', 'notification_type', 'role'],
+                condition=Q(is_read=False), name='notif_unread_user_type_role'
+            ),
+            # Approvals mark every notification about one leave/request as read
+            models.Index(fields=['notification_type', 'leave_or_notification_id'], name='notif_type_object'),
+            # archive_notifications scans old read rows
+            models.Index(fields=['is_read', 'timestamp'], name='notif_read_timestamp'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user} - {self.notification_type} - {self.role}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'is_read' in field_names:
+            instance._loaded_is_read = instance.is_read
+        return instance
+
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        was_read = getattr(self, '_loaded_is_read', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new and not self.is_read:
+                NotificationCounter.adjust(self.user_id, self.role, self.notification_type, 1)
+            elif not is_new and was_read is not None and was_read != self.is_read:
+                NotificationCounter.adjust(self.user_id, self.role, self.notification_type, -1 if self.is_read else 1)
+        self._loaded_is_read = self.is_read
+
+
+class NotificationArchive(models.Model):
+    """Read notifications moved out of Notification by the archive_notifications command."""
+    original_id = models.IntegerField(unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_notifications')
+    role = models.CharField(max_length=16, choices=NOTIFICATION_ROLE_CHOICES)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=40, choices=NOTIFICATION_TYPE_CHOICES)
+    timestamp = models.DateTimeField()
+    leave_or_notification_id = models.IntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='notif_archive_user_time'),
+        ]
+
+    def __str__(self):
+        return f"Archived notification for {self.user} - {self.notification_type} - {self.role}"
     
 
 
@@ -950,6 +1161,8 @@ class Break(models.Model):
     attendance_record = models.ForeignKey(AttendanceRecord, on_delete=models.CASCADE, related_name='breaks')
     break_type = models.CharField(max_length=20, choices=BREAK_TYPE_CHOICES, default='lunch')
     break_start = models.DateTimeField()
+    # Calendar day of break_start, set in save() so date filters can use an index
+    date = models.DateField(null=True, blank=True, editable=False)
     break_end = models.DateTimeField(null=True, blank=True)
     is_paid = models.BooleanField(default=True)
     reason = models.CharField(max_length=255, null=True, blank=True)
@@ -963,6 +1176,10 @@ class Break(models.Model):
 
     class Meta:
         ordering = ['break_start']
+        indexes = [
+            # Ongoing breaks over a day or date range (dashboards)
+            models.Index(fields=['date', 'break_end'], name='break_date_end'),
+        ]
     
     def clean(self):
         if self.break_end and self.break_start and self.break_end < self.break_start:
@@ -974,14 +1191,50 @@ class Break(models.Model):
         if self.attendance_record.clock_out and self.break_end and self.break_end > self.attendance_record.clock_out:
             raise ValidationError("Break cannot end after clock out time.")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'duration' in field_names:
+            instance._loaded_duration = instance.duration
+        if 'break_type' in field_names:
+            instance._loaded_break_type = instance.break_type
+        return instance
+
     def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        previous_duration = getattr(self, '_loaded_duration', None) or timedelta()
+        self.date = self.break_start.date()
         if self.break_end:
             self.duration = self.break_end - self.break_start
-        super().save(*args, **kwargs)
-        
-        # Update the parent attendance record
-        if self.attendance_record:
-            self.attendance_record.save()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Update the parent record's break aggregates in place instead of
+            # re-running AttendanceRecord.save()
+            changes = {}
+            if is_new:
+                changes['break_count'] = F('break_count') + 1
+                if self.break_type == 'lunch':
+                    changes['lunch_taken'] = True
+            elif self.break_type != getattr(self, '_loaded_break_type', self.break_type):
+                # Retyped to or from lunch; another lunch break may still exist
+                changes['lunch_taken'] = Exists(
+                    Break.objects.filter(attendance_record=OuterRef('pk'), break_type='lunch')
+                )
+            duration_change = (self.duration or timedelta()) - previous_duration
+            if duration_change:
+                changes['total_break_time'] = F('total_break_time') + duration_change
+            if self.break_end is None:
+                changes['open_break'] = self
+            else:
+                changes['open_break'] = Case(
+                    When(open_break=self.pk, then=Value(None)),
+                    default=F('open_break'),
+                )
+            AttendanceRecord.objects.filter(pk=self.attendance_record_id).update(**changes)
+        self._loaded_duration = self.duration
+        self._loaded_break_type = self.break_type
     
     def __str__(self):
         return f"{self.get_break_type_display()} for {self.attendance_record.user} ({self.duration})"
@@ -999,7 +1252,8 @@ class ActivityFeed(models.Model):
     
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     activity_type = models.CharField(max_length=50, choices=ACTIVITY_TYPES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the activity happens; rows are written later by utils.activity_log
+    timestamp = models.DateTimeField(default=timezone.now)
     related_record = models.ForeignKey(AttendanceRecord, on_delete=models.SET_NULL, null=True, blank=True)
     details = models.JSONField(null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -1015,6 +1269,60 @@ class ActivityFeed(models.Model):
     def __str__(self):
         return f"{self.user} {self.get_activity_type_display()} at {self.timestamp}"
 
+
+class ClockEvent(models.Model):
+    """
+    Durable queue of clock events. Endpoints append a row and return at once;
+    the process_clock_events worker applies pending rows in batches. Events
+    uploaded through the sync endpoint are applied as soon as they arrive.
+    """
+    ACTION_CHOICES = [
+        ('clock_in', 'Clock In'),
+        ('clock_out', 'Clock Out'),
+        ('break_start', 'Break Start'),
+        ('break_end', 'Break End'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('applied', 'Applied'),
+        ('rejected', 'Rejected'),
+    ]
+
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='clock_events')
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    occurred_at = models.DateTimeField()
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    result = models.TextField(blank=True, default='')
+    attendance_record = models.ForeignKey(AttendanceRecord, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.action} at {self.occurred_at} ({self.status})"
+
+class ApiToken(models.Model):
+    """
+    Bearer token for a device or integration calling the attendance API.
+
+    Only the SHA-256 digest of the token is stored; the plain token is shown
+    once, by the create_api_token command.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, help_text="Device or integration using this token")
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
+
 class AttendanceSummary(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='attendance_summaries')
     month = models.PositiveSmallIntegerField()
@@ -1260,4 +1568,26 @@ class EarylyClockOutRequest(models.Model):
             self.reviewed_at = timezone.now()
             super().save(update_fields=['reviewed_at'])
 
+
+class ClockOutEligibility(models.Model):
+    """
+    What a user's clock-out depends on for one day, kept current by the
+    DailySchedule, DailyUpdate and EarlyClockOutRequest signals
+    (see utils.clock_out_eligibility).
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='clock_out_eligibility')
+    date = models.DateField()
+    has_schedule = models.BooleanField(default=False)
+    update_submitted = models.BooleanField(default=False)
+    early_clock_out_approved = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='one_clock_out_eligibility_per_day'),
+        ]
+
+    def __str__(self):
+        return f"Clock-out eligibility of {self.user} on {self.date}"
+
     
@@ -1,9 +1,105 @@
 
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from main_app.models import Notification
+from main_app.models import Notification, NotificationCounter, Manager
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.core.cache import cache
+from main_app.utils.request_profile import HR_DEPARTMENT_NAMES
+from main_app.utils.notification_cache import (
+    UNREAD_COUNTS_TIMEOUT, get_notification_version, unread_counts_key
+)
+from main_app.utils.versioned_cache import cache_timeout
+
+
+# Unread badge counters per user type, each one a filter over the user's own notification counters
+UNREAD_COUNT_FILTERS = {
+    '1': {
+        'manager_leave': Q(role='ceo', notification_type='manager-leave-notification'),
+        'employee_leave': Q(role='ceo', notification_type='employee-leave-notification'),
+    },
+    '2': {
+        'general': Q(role='manager', notification_type='general-notification'),
+        'leave': Q(role='manager', notification_type='leave-notification'),
+        'clockout': Q(role='manager', notification_type='clockout-notification'),
+        'manager_leave': Q(role='manager', notification_type='manager-leave-notification'),
+    },
+    '3': {
+        'from_manager': Q(role='employee', notification_type__in=['notification-from-manager', 'notification-from-admin']),
+        'leave_status': Q(role='employee', notification_type='leave-notification'),
+        'clockout': Q(role='employee', notification_type='clockout-notification'),
+        'asset': Q(role='employee', notification_type='asset-notification'),
+    },
+}
+
+# HR managers see every pending asset request addressed to managers, not only their own
+HR_ASSET_FILTER = Q(role='manager', notification_type='asset-notification')
+
+
+def is_hr_manager(user):
+    manager = Manager.objects.select_related('department').filter(admin=user).first()
+    if not manager or not manager.department:
+        return False
+    return manager.department.name.lower().strip() in HR_DEPARTMENT_NAMES
+
+
+def get_unread_counts(user, profile=None):
+    """
+    Return the unread badge counts of a user, summed from the user's
+    NotificationCounter rows in one query and cached until one of the
+    user's notifications is created, read or deleted.
+
+    Pass the request profile to reuse its HR lookup on a cache miss.
+    """
+    key = unread_counts_key(user.id, get_notification_version(user.id))
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    user_type = user.user_type if user.user_type in UNREAD_COUNT_FILTERS else '3'
+    base_filter = Q(user=user)
+    aggregates = {
+        name: Coalesce(Sum('unread', filter=Q(user=user) & count_filter), 0)
+        for name, count_filter in UNREAD_COUNT_FILTERS[user_type].items()
+    }
+    if user_type == '2':
+        if profile.is_hr if profile is not None else is_hr_manager(user):
+            base_filter |= HR_ASSET_FILTER
+            aggregates['asset'] = Coalesce(Sum('unread', filter=HR_ASSET_FILTER), 0)
+
+    counts = NotificationCounter.objects.filter(base_filter, unread__gt=0).aggregate(**aggregates)
+    if user_type == '2':
+        counts.setdefault('asset', 0)
+    # Employee clock-out replies are not part of the bell total
+    counts['total'] = sum(
+        count for name, count in counts.items()
+        if not (user_type == '3' and name == 'clockout')
+    )
+    counts['user_type'] = user_type
+    cache.set(key, counts, cache_timeout(UNREAD_COUNTS_TIMEOUT))
+    return counts
+
+
+# Badge fields sent to the browser for each user type
+BADGE_FIELDS = {
+    '1': ['manager_leave', 'employee_leave'],
+    '2': ['general', 'leave', 'clockout', 'asset', 'manager_leave'],
+    '3': ['from_manager', 'leave_status', 'clockout', 'asset'],
+}
+
+
+def badge_payload(counts):
+    """Shape get_unread_counts() output the way the navbar script expects it."""
+    payload = {
+        'success': True,
+        'total': counts['total'],
+        'last_updated': timezone.now(),
+    }
+    payload.update({name: counts[name] for name in BADGE_FIELDS[counts['user_type']]})
+    return payload
 
 def send_notification(user, message,notification_type,id,role):
     Notification.objects.create(
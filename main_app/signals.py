@@ -1,8 +1,16 @@
 # timesheet/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Admin,Manager,Employee,CustomUser
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from .models import Admin,Manager,Employee,CustomUser,Notification,NotificationCounter,LeaveBalance,AttendanceRecord,Break,EarylyClockOutRequest,ApiToken,DailySchedule,DailyUpdate,FaceProfile,LEAVE_BALANCE_VERSION_KEY
+from .utils.notification_cache import bump_notification_version
+from .utils.versioned_cache import bump_version
+from .utils.realtime import push_event
+from .utils.attendance_state import invalidate_attendance_state
+from .utils.clock_out_eligibility import refresh_clock_out_eligibility
+from .utils.face_index import invalidate_face_index
+from .authentication import forget_api_token
 
 
 @receiver(post_save, sender=CustomUser)
@@ -26,3 +34,143 @@ def save_user_profile(sender, instance, **kwargs):
         instance.employee.save()
 
 
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_notification_counts(sender, instance, **kwargs):
+    bump_notification_version(
+        [instance.user_id],
+        asset=instance.notification_type == 'asset-notification'
+    )
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    # Leave and clock-out decisions and asset requests all arrive as notifications
+    if created:
+        push_event(
+            instance.user_id, 'notification',
+            id=instance.pk,
+            message=instance.message,
+            notification_type=instance.notification_type,
+            role=instance.role,
+        )
+
+
+@receiver(post_delete, sender=Notification)
+def decrement_notification_counter(sender, instance, **kwargs):
+    if not instance.is_read:
+        NotificationCounter.adjust(instance.user_id, instance.role, instance.notification_type, -1)
+
+
+@receiver(post_save, sender=LeaveBalance)
+@receiver(post_delete, sender=LeaveBalance)
+def invalidate_leave_balance_summary(sender, instance, **kwargs):
+    bump_version(LEAVE_BALANCE_VERSION_KEY.format(instance.employee_id))
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def materialize_leave_balances(sender, instance, created, **kwargs):
+    # Leave balances start with the first clock-in; each later clock-in only
+    # fills in a month that the rollover command has not created yet.
+    if not created or instance.status not in ['present', 'late', 'half_day']:
+        return
+    employee = getattr(instance.user, 'employee', None)
+    if employee and employee.date_of_joining:
+        transaction.on_commit(lambda: LeaveBalance.initialize_balances(employee, instance.date))
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def push_clock_state(sender, instance, **kwargs):
+    push_event(
+        instance.user_id, 'clock',
+        record_id=instance.pk,
+        date=instance.date,
+        clock_in=instance.clock_in,
+        clock_out=instance.clock_out,
+        clocked_in=instance.clock_out is None,
+        status=instance.status,
+    )
+
+
+# Drop the cached header timer state (utils.attendance_state) on clock-in/out,
+# breaks and early clock-out decisions; the next page view rebuilds it.
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def invalidate_attendance_state_for_user(sender, instance, **kwargs):
+    invalidate_attendance_state([instance.user_id])
+
+
+def refresh_clock_out_eligibility_on_commit(user_id, day):
+    # After commit, so a cascade that also deletes the user leaves no row behind
+    transaction.on_commit(lambda: refresh_clock_out_eligibility(user_id, day))
+    invalidate_attendance_state([user_id])
+
+
+@receiver(post_save, sender=DailySchedule)
+@receiver(post_delete, sender=DailySchedule)
+def refresh_eligibility_for_schedule(sender, instance, **kwargs):
+    user_id = Employee.objects.filter(pk=instance.employee_id).values_list('admin_id', flat=True).first()
+    if user_id:
+        refresh_clock_out_eligibility_on_commit(user_id, instance.date)
+
+
+@receiver(post_save, sender=DailyUpdate)
+@receiver(post_delete, sender=DailyUpdate)
+def refresh_eligibility_for_update(sender, instance, **kwargs):
+    schedule = DailySchedule.objects.filter(pk=instance.schedule_id).values('employee__admin_id', 'date').first()
+    if schedule:
+        refresh_clock_out_eligibility_on_commit(schedule['employee__admin_id'], schedule['date'])
+
+
+@receiver(post_save, sender=EarylyClockOutRequest)
+@receiver(post_delete, sender=EarylyClockOutRequest)
+def refresh_eligibility_for_early_clock_out(sender, instance, **kwargs):
+    day = AttendanceRecord.objects.filter(pk=instance.attendance_record_id).values_list('date', flat=True).first()
+    if day:
+        refresh_clock_out_eligibility_on_commit(instance.user_id, day)
+    else:
+        invalidate_attendance_state([instance.user_id])
+
+
+@receiver(post_save, sender=Break)
+@receiver(post_delete, sender=Break)
+def invalidate_attendance_state_for_break(sender, instance, **kwargs):
+    invalidate_attendance_state([instance.attendance_record.user_id])
+
+
+@receiver(post_delete, sender=Break)
+def remove_break_from_totals(sender, instance, **kwargs):
+    # Break.save() adds to the record's break aggregates; take this break back out
+    changes = {'break_count': F('break_count') - 1}
+    if instance.duration:
+        changes['total_break_time'] = F('total_break_time') - instance.duration
+    if instance.break_type == 'lunch':
+        changes['lunch_taken'] = Exists(
+            Break.objects.filter(attendance_record=OuterRef('pk'), break_type='lunch')
+        )
+    AttendanceRecord.objects.filter(pk=instance.attendance_record_id).update(**changes)
+
+
+@receiver(post_save, sender=ApiToken)
+@receiver(post_delete, sender=ApiToken)
+def forget_cached_api_token(sender, instance, **kwargs):
+    # Revoked or deleted tokens must stop working at once, not when the cache expires
+    digest = instance.digest
+    transaction.on_commit(lambda: forget_api_token(digest))
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_api_tokens_of_inactive_user(sender, instance, **kwargs):
+    if not instance.is_active:
+        digests = list(ApiToken.objects.filter(user=instance).values_list('digest', flat=True))
+
+        def forget_all():
+            for digest in digests:
+                forget_api_token(digest)
+        transaction.on_commit(forget_all)
+
+
+@receiver(post_save, sender=FaceProfile)
+@receiver(post_delete, sender=FaceProfile)
+def refresh_face_index(sender, instance, **kwargs):
+    invalidate_face_index()
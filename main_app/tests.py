@@ -1,3 +1,1198 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import IntegrityError, transaction
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404, JsonResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import (
+    ActivityFeed, AttendanceRecord, Break, ClockEvent, ClockOutEligibility, CustomUser, DailySchedule, DailyUpdate,
+    Department, Division, Employee, FaceEnrollmentJob, FaceProfile, LeaveBalance, Manager, Notification,
+    NotificationArchive, NotificationCounter,
+)
+from .authentication import CachedTokenAuthentication, create_api_token
+from .consumers import NotificationConsumer
+from .context_processors import lazy_unread_notification_count
+from .middleware import LoginCheckMiddleWare
+from .utils.activity_log import ActivityFeedBuffer, activity_feed_buffer
+from .utils.attendance_state import ATTENDANCE_STATE_KEY, get_attendance_state
+from .utils.clock_actions import clock_out, end_break, start_break
+from .utils.clock_events import enqueue_clock_event, process_pending_events, sync_clock_events
+from .utils.clock_in import ClockInError, clock_in
+from .utils.clock_out_eligibility import get_clock_out_eligibility
+from .utils.face_enrollment import queue_face_enrollment, run_enrollment_job
+from .utils.face_index import batched_face_snapshot, get_face_index, write_face_snapshot
+from .utils.face_matchers import BruteForceMatcher, IVFMatcher, build_matcher
+from .utils.face_preprocess import StageTimer, encode_frame, select_face
+from .utils.realtime import push_event
+from .utils.idempotency import idempotent
+from .notification_badge import get_unread_counts
+from .utils.notification_cache import NOTIFICATION_VERSION_KEY, get_notification_version, notification_etag
+from .utils.request_profile import get_request_profile
+from .utils.versioned_cache import PROCESS_LOCAL_TIMEOUT, bump_version, cache_timeout
+
+
+class RequestProfileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Operations')
+        cls.hr = Department.objects.create(name='HR', division=division)
+        cls.employee_user = CustomUser.objects.create_user(
+            email='profile-employee@example.com', password='secret', user_type='3',
+            first_name='Pro', last_name='File',
+        )
+        Employee.objects.create(
+            admin=cls.employee_user, division=division, department=cls.hr,
+            designation='Recruiter', phone_number='9999999999',
+        )
+        cls.manager_user = CustomUser.objects.create_user(
+            email='profile-manager@example.com', password='secret', user_type='2',
+            first_name='Head', last_name='Hunter',
+        )
+        Manager.objects.create(admin=cls.manager_user, division=division, department=cls.hr)
+
+    def profile(self, user):
+        request = RequestFactory().get('/')
+        request.user = CustomUser.objects.get(pk=user.pk)
+        return get_request_profile(request), request
+
+    def test_profile_loads_in_one_query(self):
+        profile, request = self.profile(self.employee_user)
+        with self.assertNumQueries(1):
+            self.assertEqual(profile.employee_or_404().designation, 'Recruiter')
+            self.assertEqual(profile.department, self.hr)
+            self.assertEqual(profile.division.name, 'Operations')
+            self.assertEqual(profile.role, 'employee')
+            self.assertFalse(profile.is_hr)
+            # Views reading request.user's relations share the loaded rows
+            self.assertEqual(request.user.employee.department.name, 'HR')
+        self.assertIs(get_request_profile(request), profile)
+
+    def test_wrong_role_is_a_404(self):
+        employee_profile, _ = self.profile(self.employee_user)
+        manager_profile, _ = self.profile(self.manager_user)
+        with self.assertRaises(Http404):
+            employee_profile.manager_or_404()
+        with self.assertRaises(Http404):
+            manager_profile.employee_or_404()
+        self.assertEqual(manager_profile.manager_or_404().admin_id, self.manager_user.pk)
+        self.assertTrue(manager_profile.is_hr)
+
+    def test_anonymous_profile_runs_no_query(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        profile = get_request_profile(request)
+        with self.assertNumQueries(0):
+            self.assertIsNone(profile.employee)
+            self.assertIsNone(profile.role)
+            with self.assertRaises(Http404):
+                profile.employee_or_404()
+
+
+class LazyContextProcessorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='lazy@example.com', password='secret', user_type='3',
+            first_name='Lazy', last_name='Reader',
+        )
+        Notification.objects.create(
+            user=cls.user, role='employee', message='Hello', notification_type='notification-from-manager',
+            leave_or_notification_id=1,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = CustomUser.objects.get(pk=self.user.pk)
+
+    def render(self, source):
+        context = Context(lazy_unread_notification_count(self.request))
+        return Template(source).render(context)
+
+    def test_unused_keys_run_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render('<p>Report</p>'), '<p>Report</p>')
+
+    def test_processor_runs_once_for_every_key_read(self):
+        source = '{{ total_unread_notifications }}/{{ employee_notification_from_manager_count }}'
+        with self.assertNumQueries(1):
+            self.assertEqual(self.render(source), '1/1')
+
+
+class NotificationBadgeCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='badge@example.com', password='secret', user_type='3',
+            first_name='Badge', last_name='Reader',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def notify(self):
+        return Notification.objects.create(
+            user=self.user, role='employee', message='Hello', notification_type='notification-from-manager',
+            leave_or_notification_id=1,
+        )
+
+    def test_version_is_bumped_only_after_commit(self):
+        version = get_notification_version(self.user.id)
+        self.assertEqual(get_unread_counts(self.user)['from_manager'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify()
+            # Other connections cannot see the row yet, so the version must not move
+            self.assertEqual(get_notification_version(self.user.id), version)
+        self.assertNotEqual(get_notification_version(self.user.id), version)
+        self.assertEqual(get_unread_counts(self.user)['from_manager'], 1)
+
+    def test_per_process_cache_keeps_entries_briefly(self):
+        self.assertEqual(cache_timeout(60 * 60 * 24), PROCESS_LOCAL_TIMEOUT)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(cache_timeout(60 * 60 * 24), 60 * 60 * 24)
+
+
+class NotificationCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='counter@example.com', password='secret', user_type='3',
+            first_name='Count', last_name='Keeper',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def notification(self, **kwargs):
+        fields = {
+            'user': self.user, 'role': 'employee', 'message': 'Hello',
+            'notification_type': 'notification-from-manager', 'leave_or_notification_id': 1,
+        }
+        fields.update(kwargs)
+        return Notification(**fields)
+
+    def unread(self, notification_type='notification-from-manager'):
+        counter = NotificationCounter.objects.filter(
+            user=self.user, role='employee', notification_type=notification_type
+        ).first()
+        return counter.unread if counter else 0
+
+    def verify(self):
+        call_command('rebuild_notification_counters', verify_only=True, stdout=StringIO(), stderr=StringIO())
+
+    def test_save_and_mark_read(self):
+        notification = self.notification()
+        notification.save()
+        self.notification(is_read=True).save()
+        self.assertEqual(self.unread(), 1)
+
+        notification.is_read = True
+        notification.save()
+        self.assertEqual(self.unread(), 0)
+        # Saving an already read notification again must not count twice
+        Notification.objects.get(pk=notification.pk).save()
+        self.assertEqual(self.unread(), 0)
+        self.verify()
+
+    def test_queryset_update_and_bulk_create(self):
+        Notification.objects.bulk_create([self.notification() for _ in range(3)] + [
+            self.notification(notification_type='leave-notification'),
+            self.notification(is_read=True),
+        ])
+        self.assertEqual(self.unread(), 3)
+        self.assertEqual(self.unread('leave-notification'), 1)
+
+        Notification.objects.filter(notification_type='notification-from-manager').update(is_read=True)
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(self.unread('leave-notification'), 1)
+
+        Notification.objects.filter(pk__in=Notification.objects.values('pk')[:2]).update(is_read=False)
+        self.assertEqual(self.unread(), 2)
+        self.verify()
+
+    def test_delete(self):
+        unread = self.notification()
+        unread.save()
+        self.notification(is_read=True).save()
+        self.notification().save()
+        unread.delete()
+        self.assertEqual(self.unread(), 1)
+        Notification.objects.all().delete()
+        self.assertEqual(self.unread(), 0)
+        self.verify()
+
+    def test_verify_only_reports_drift(self):
+        self.notification().save()
+        NotificationCounter.objects.update(unread=5)
+        stderr = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_notification_counters', verify_only=True, stdout=StringIO(), stderr=stderr)
+        self.assertIn('expected 1, counter 5', stderr.getvalue())
+        # verify-only leaves the drift alone, a rebuild fixes it
+        self.assertEqual(self.unread(), 5)
+        call_command('rebuild_notification_counters', stdout=StringIO())
+        self.assertEqual(self.unread(), 1)
+
+
+class CheckNewNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='poll@example.com', password='secret', user_type='3',
+            first_name='Long', last_name='Poll',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('check_new_notification')
+
+    def test_unchanged_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(etag, notification_etag(self.user.pk))
+
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_version_bump_ends_the_wait(self):
+        etag = notification_etag(self.user.pk)
+        calls = []
+
+        def etag_after_bump(user_id):
+            # The view reads the ETag once up front; bump on the first poll
+            calls.append(user_id)
+            if len(calls) == 2:
+                bump_version(NOTIFICATION_VERSION_KEY.format(user_id))
+            return notification_etag(user_id)
+
+        with mock.patch('main_app.views.NOTIFICATION_POLL_INTERVAL', 0), \
+                mock.patch('main_app.views.notification_etag', side_effect=etag_after_bump):
+            response = self.client.get(self.url, {'wait': 30}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['ETag'], notification_etag(self.user.pk))
+
+    def test_wait_without_change_times_out_as_not_modified(self):
+        etag = notification_etag(self.user.pk)
+        with mock.patch('main_app.views.NOTIFICATION_POLL_INTERVAL', 0.01):
+            response = self.client.get(self.url, {'wait': 0.05}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class LoginCheckMiddlewareTests(TestCase):
+    ALLOW, LOGIN, HOME, FORBIDDEN = 'allow', 'login', 'home', 403
+
+    # route -> expected outcome for (anonymous, CEO, manager, HR manager, employee).
+    # HR managers route exactly like other managers; HR-only behaviour lives in the views.
+    MATRIX = {
+        'admin_home': (LOGIN, ALLOW, HOME, HOME, HOME),
+        'manager_home': (LOGIN, ALLOW, ALLOW, ALLOW, HOME),
+        'employee_home': (LOGIN, HOME, HOME, HOME, ALLOW),
+        'check_new_notification': (LOGIN, ALLOW, ALLOW, ALLOW, ALLOW),
+        'asset_app:assets-list': (LOGIN, ALLOW, ALLOW, ALLOW, FORBIDDEN),
+        'asset_app:print_all_barcode': (LOGIN, ALLOW, ALLOW, ALLOW, FORBIDDEN),
+        'asset_app:my-assets': (LOGIN, ALLOW, ALLOW, ALLOW, ALLOW),
+        'open_camera': (ALLOW, ALLOW, ALLOW, ALLOW, ALLOW),
+        'login_page': (ALLOW, ALLOW, ALLOW, ALLOW, ALLOW),
+        'clock_in_out_api': (ALLOW, ALLOW, ALLOW, ALLOW, ALLOW),
+        'clock_event_sync_api': (ALLOW, ALLOW, ALLOW, ALLOW, ALLOW),
+        'password_reset': (ALLOW, ALLOW, ALLOW, ALLOW, ALLOW),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Operations')
+        hr = Department.objects.create(name='HR', division=division)
+        sales = Department.objects.create(name='Sales', division=division)
+
+        def user(email, user_type):
+            return CustomUser.objects.create_user(
+                email=email, password='secret', user_type=user_type, first_name='Route', last_name='Check',
+            )
+
+        ceo = user('route-ceo@example.com', '1')
+        manager = user('route-manager@example.com', '2')
+        Manager.objects.create(admin=manager, division=division, department=sales)
+        hr_manager = user('route-hr@example.com', '2')
+        Manager.objects.create(admin=hr_manager, division=division, department=hr)
+        employee = user('route-employee@example.com', '3')
+        Employee.objects.create(
+            admin=employee, division=division, department=sales,
+            designation='Clerk', phone_number='9999999999',
+        )
+        cls.users = (AnonymousUser(), ceo, manager, hr_manager, employee)
+
+    def outcome(self, user, url_name):
+        path = reverse(url_name)
+        request = RequestFactory().get(path)
+        request.user = user
+        request.session = SessionStore()
+        request.resolver_match = match = resolve(path)
+        response = LoginCheckMiddleWare(lambda request: None).process_view(
+            request, match.func, match.args, match.kwargs
+        )
+        if response is None:
+            return self.ALLOW
+        if response.status_code == 403:
+            return self.FORBIDDEN
+        self.assertEqual(response.status_code, 302)
+        if response.url == reverse('login_page'):
+            return self.LOGIN
+        home = {'1': 'admin_home', '2': 'manager_home', '3': 'employee_home'}[user.user_type]
+        self.assertEqual(response.url, reverse(home))
+        return self.HOME
+
+    def test_role_route_matrix(self):
+        labels = ('anonymous', 'ceo', 'manager', 'hr manager', 'employee')
+        for url_name, expected in self.MATRIX.items():
+            for label, user, want in zip(labels, self.users, expected):
+                with self.subTest(route=url_name, user=label):
+                    self.assertEqual(self.outcome(user, url_name), want)
+
+
+class NotificationConsumerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='socket@example.com', password='secret', user_type='3',
+            first_name='Web', last_name='Socket',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def communicator(self, user):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        return communicator
+
+    def push(self, user_id, event, **payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            push_event(user_id, event, **payload)
+
+    async def test_anonymous_user_is_rejected(self):
+        connected, _ = await self.communicator(AnonymousUser()).connect()
+        self.assertFalse(connected)
+
+    async def test_user_joins_group_and_receives_events(self):
+        communicator = self.communicator(self.user)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        badge = await communicator.receive_json_from()
+        self.assertEqual(badge['type'], 'badge')
+        self.assertEqual(badge['total'], 0)
+
+        await sync_to_async(self.push)(self.user.pk, 'clock', state='clocked_in', at=date(2026, 1, 5))
+        self.assertEqual(
+            await communicator.receive_json_from(),
+            {'type': 'clock', 'state': 'clocked_in', 'at': '2026-01-05'},
+        )
+        # Events for other users never reach this socket
+        await sync_to_async(self.push)(self.user.pk + 1, 'clock', state='clocked_out')
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+class FakeTimer:
+    """Stands in for threading.Timer; the test fires it by hand."""
+    def __init__(self, interval, function):
+        self.interval = interval
+        self.function = function
+        self.started = self.cancelled = False
+
+    def start(self):
+        self.started = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ActivityFeedBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='feed@example.com', password='secret', user_type='3',
+            first_name='Feed', last_name='Writer',
+        )
+
+    def buffer(self, **kwargs):
+        timers = []
+
+        def timer(interval, function):
+            timers.append(FakeTimer(interval, function))
+            return timers[-1]
+
+        with mock.patch('main_app.utils.activity_log.atexit.register') as register:
+            buffer = ActivityFeedBuffer(timer=timer, **kwargs)
+        return buffer, timers, register
+
+    def add(self, buffer, count=1, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                buffer.add(**{'user': self.user, 'activity_type': 'clock_in', **fields})
+
+    def test_flushes_when_full(self):
+        buffer, timers, _ = self.buffer(max_size=3)
+        self.add(buffer, 2)
+        self.assertEqual(ActivityFeed.objects.count(), 0)
+        self.assertEqual(len(timers), 1)
+        self.add(buffer)
+        self.assertEqual(ActivityFeed.objects.count(), 3)
+        self.assertTrue(timers[0].cancelled)
+
+    def test_flushes_when_oldest_entry_is_max_age(self):
+        buffer, timers, _ = self.buffer(max_age=5.0)
+        self.add(buffer, 2)
+        # One timer per batch, started by the first entry
+        self.assertEqual(len(timers), 1)
+        self.assertTrue(timers[0].started)
+        self.assertEqual(timers[0].interval, 5.0)
+        self.assertEqual(ActivityFeed.objects.count(), 0)
+        with mock.patch('main_app.utils.activity_log.connection') as timer_connection:
+            timers[0].function()
+        timer_connection.close.assert_called_once_with()
+        self.assertEqual(ActivityFeed.objects.count(), 2)
+
+        self.add(buffer)
+        self.assertEqual(len(timers), 2)
+
+    def test_flushes_at_exit(self):
+        buffer, _, register = self.buffer()
+        register.assert_called_once_with(buffer.flush)
+        self.add(buffer)
+        register.call_args.args[0]()
+        self.assertEqual(ActivityFeed.objects.count(), 1)
+
+    def test_bad_row_does_not_lose_the_batch(self):
+        buffer, _, _ = self.buffer(max_size=3)
+        self.add(buffer, activity_type='clock_in')
+        self.add(buffer, activity_type=None)
+        with self.assertLogs('main_app.utils.activity_log', level='ERROR') as logs:
+            self.add(buffer, activity_type='clock_out')
+        self.assertEqual(
+            sorted(ActivityFeed.objects.values_list('activity_type', flat=True)), ['clock_in', 'clock_out']
+        )
+        self.assertIn('retrying row by row', logs.output[0])
+        self.assertIn('Dropped ActivityFeed entry None', logs.output[1])
+
+    def test_rolled_back_entries_are_dropped(self):
+        buffer, timers, _ = self.buffer()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                buffer.add(user=self.user, activity_type='clock_in')
+                raise IntegrityError
+        buffer.flush()
+        self.assertEqual(ActivityFeed.objects.count(), 0)
+        self.assertEqual(timers, [])
+
+
+class ArchiveNotificationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='archive@example.com', password='secret', user_type='3',
+            first_name='Old', last_name='News',
+        )
+
+    def notification(self, is_read, days_old):
+        notification = Notification.objects.create(
+            user=self.user, role='employee', message='Hello', notification_type='notification-from-manager',
+            leave_or_notification_id=1, is_read=is_read,
+        )
+        Notification.objects.filter(pk=notification.pk).update(timestamp=timezone.now() - timedelta(days=days_old))
+        return notification
+
+    def archive(self):
+        call_command('archive_notifications', '--days', '90', stdout=StringIO())
+
+    def test_old_read_notifications_are_moved(self):
+        old_read = self.notification(True, 100)
+        old_unread = self.notification(False, 100)
+        recent_read = self.notification(True, 10)
+        self.archive()
+
+        self.assertEqual(
+            set(Notification.objects.values_list('pk', flat=True)), {old_unread.pk, recent_read.pk}
+        )
+        self.assertEqual(list(NotificationArchive.objects.values_list('original_id', flat=True)), [old_read.pk])
+
+    def test_notification_marked_unread_after_the_copy_is_kept(self):
+        first, second = self.notification(True, 100), self.notification(True, 100)
+        bulk_create = NotificationArchive.objects.bulk_create
+
+        def copy_then_mark_unread(*args, **kwargs):
+            created = bulk_create(*args, **kwargs)
+            Notification.objects.filter(pk=second.pk).update(is_read=False)
+            return created
+
+        with mock.patch.object(NotificationArchive.objects, 'bulk_create', side_effect=copy_then_mark_unread):
+            self.archive()
+
+        self.assertEqual(list(Notification.objects.values_list('pk', flat=True)), [second.pk])
+        self.assertEqual(list(NotificationArchive.objects.values_list('original_id', flat=True)), [first.pk])
+
+
+class ClockInServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Engineering')
+        cls.department = Department.objects.create(name='Backend', division=division)
+        cls.user = CustomUser.objects.create_user(
+            email='employee@example.com', password='secret', user_type='3',
+            first_name='Test', last_name='Employee',
+        )
+        Employee.objects.create(
+            admin=cls.user, division=division, department=cls.department,
+            designation='Developer', phone_number='9999999999', date_of_joining=date(2026, 3, 1),
+        )
+
+    def setUp(self):
+        self.addCleanup(activity_feed_buffer.flush)
+
+    def test_clock_in_query_budget(self):
+        LeaveBalance.create_balance(self.user.employee, 2026, 3)
+        # In the request: 1 user/profile/leave lookup, then savepoint, record
+        # insert and release. After commit: 1 leave balance check; the header
+        # state is only dropped from the cache and the ActivityFeed row is
+        # written behind. Nothing else is read or written for the header.
+        with self.assertNumQueries(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertNumQueries(4):
+                    record = clock_in(self.user.id, datetime(2026, 3, 2, 9, 0))
+        self.assertFalse(ClockOutEligibility.objects.filter(user=self.user).exists())
+
+        self.assertEqual(record.status, 'present')
+        self.assertEqual(record.department_id, self.department.id)
+        activity_feed_buffer.flush()
+        self.assertTrue(ActivityFeed.objects.filter(related_record=record, activity_type='clock_in').exists())
+
+    def test_first_clock_in_creates_leave_balances(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            clock_in(self.user.id, datetime(2026, 4, 1, 9, 0))
+        self.assertEqual(
+            list(LeaveBalance.objects.filter(employee__admin=self.user).values_list('month', flat=True)), [3, 4]
+        )
+
+    def test_second_clock_in_same_day_is_rejected(self):
+        clock_in(self.user.id, datetime(2026, 3, 2, 9, 0))
+        with self.assertRaises(ClockInError) as raised:
+            clock_in(self.user.id, datetime(2026, 3, 2, 9, 5))
+        self.assertEqual(raised.exception.code, 'already_clocked_in')
+        self.assertEqual(AttendanceRecord.objects.filter(user=self.user).count(), 1)
+
+    def test_one_open_record_per_day_constraint(self):
+        clock_in(self.user.id, datetime(2026, 3, 2, 9, 0))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AttendanceRecord.objects.create(
+                user=self.user, date=datetime(2026, 3, 2).date(), clock_in=datetime(2026, 3, 2, 9, 5)
+            )
+
+
+class BreakAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Engineering')
+        department = Department.objects.create(name='Backend', division=division)
+        cls.user = CustomUser.objects.create_user(
+            email='lead@example.com', password='secret', user_type='2',
+            first_name='Team', last_name='Lead',
+        )
+        Manager.objects.create(admin=cls.user, division=division, department=department)
+
+    def setUp(self):
+        self.addCleanup(activity_feed_buffer.flush)
+        self.record = clock_in(self.user.id, datetime(2026, 3, 2, 9, 0))
+
+    def take_lunch(self):
+        start_break(self.user.id, datetime(2026, 3, 2, 12, 0), break_type='lunch')
+        end_break(self.user.id, datetime(2026, 3, 2, 12, 30))
+
+    def assert_lunch_recorded(self):
+        record = AttendanceRecord.objects.get(pk=self.record.pk)
+        self.assertEqual(record.total_break_time, timedelta(minutes=30))
+        self.assertEqual(record.break_count, 1)
+        self.assertTrue(record.lunch_taken)
+        self.assertIsNone(record.open_break_id)
+        return record
+
+    def test_clock_out_keeps_break_totals(self):
+        self.take_lunch()
+        clock_out(self.user.id, datetime(2026, 3, 2, 18, 0))
+        record = self.assert_lunch_recorded()
+        self.assertEqual(record.total_worked, timedelta(hours=9))
+
+    def test_full_save_of_a_stale_copy_keeps_break_totals(self):
+        self.take_lunch()
+        # self.record was loaded before the break
+        self.record.status = 'half_day'
+        self.record.save()
+        self.assertEqual(self.assert_lunch_recorded().status, 'half_day')
+
+    def test_retyping_a_break_recomputes_lunch_taken(self):
+        self.take_lunch()
+        lunch = Break.objects.get(attendance_record=self.record)
+        lunch.break_type = 'short'
+        lunch.save()
+        self.assertFalse(AttendanceRecord.objects.get(pk=self.record.pk).lunch_taken)
+
+        lunch.break_type = 'lunch'
+        lunch.save()
+        self.assert_lunch_recorded()
+
+
+class AttendanceStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Engineering')
+        department = Department.objects.create(name='Backend', division=division)
+        cls.user = CustomUser.objects.create_user(
+            email='header@example.com', password='secret', user_type='2',
+            first_name='Header', last_name='Timer',
+        )
+        Manager.objects.create(admin=cls.user, division=division, department=department)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(activity_feed_buffer.flush)
+        with self.captureOnCommitCallbacks(execute=True):
+            clock_in(self.user.id, datetime(2026, 3, 2, 9, 0))
+
+    def test_writes_drop_the_state_and_the_next_read_rebuilds_it(self):
+        self.assertIsNone(get_attendance_state(self.user.id)['open_break'])
+        key = ATTENDANCE_STATE_KEY.format(self.user.id)
+        self.assertIsNotNone(cache.get(key))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            start_break(self.user.id, datetime(2026, 3, 2, 12, 0), break_type='lunch')
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+        self.assertIsNone(cache.get(key))
+
+        self.assertEqual(get_attendance_state(self.user.id)['open_break']['break_type'], 'lunch')
+        with self.assertNumQueries(0):
+            get_attendance_state(self.user.id)
+
+
+class ClockEventSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Engineering')
+        department = Department.objects.create(name='Backend', division=division)
+        cls.user = CustomUser.objects.create_user(
+            email='offline@example.com', password='secret', user_type='3',
+            first_name='Offline', last_name='Employee',
+        )
+        Employee.objects.create(
+            admin=cls.user, division=division, department=department,
+            designation='Developer', phone_number='9999999999',
+        )
+
+    def setUp(self):
+        # Write buffered ActivityFeed rows while the test database still exists
+        self.addCleanup(activity_feed_buffer.flush)
+
+    def sync(self, events, now=datetime(2026, 3, 2, 19, 0)):
+        with self.captureOnCommitCallbacks(execute=True):
+            return sync_clock_events(self.user.id, events, now=now)
+
+    def test_events_apply_in_order_and_replay_is_idempotent(self):
+        events = [
+            {'action': 'clock_in', 'timestamp': '2026-03-02T09:00:00', 'idempotency_key': 'a1'},
+            {'action': 'break_start', 'timestamp': '2026-03-02T12:00:00', 'idempotency_key': 'a2', 'break_type': 'lunch'},
+            {'action': 'break_end', 'timestamp': '2026-03-02T12:30:00', 'idempotency_key': 'a3'},
+            {'action': 'break_start', 'timestamp': '2026-03-02T15:00:00', 'idempotency_key': 'a4', 'break_type': 'lunch'},
+        ]
+        results = self.sync(events)
+        self.assertEqual(
+            [r['clock_status'] for r in results], ['confirmed', 'confirmed', 'confirmed', 'rejected']
+        )
+        record = AttendanceRecord.objects.get(user=self.user)
+        self.assertTrue(record.lunch_taken)
+        self.assertEqual(record.break_count, 1)
+        self.assertIsNone(record.open_break_id)
+
+        replayed = self.sync(events)
+        self.assertTrue(all(r['duplicate'] for r in replayed))
+        self.assertEqual([r['clock_status'] for r in replayed], [r['clock_status'] for r in results])
+        self.assertEqual(ClockEvent.objects.filter(user=self.user).count(), 4)
+
+    def test_invalid_events_are_rejected_without_a_row(self):
+        results = self.sync([
+            {'action': 'teleport', 'timestamp': '2026-03-02T09:00:00', 'idempotency_key': 'b1'},
+            {'action': 'clock_in', 'timestamp': 'yesterday', 'idempotency_key': 'b2'},
+            {'action': 'clock_out', 'timestamp': '2026-03-02T18:00:00', 'idempotency_key': 'b3'},
+        ])
+        self.assertEqual([r['clock_status'] for r in results], ['rejected'] * 3)
+        self.assertEqual(ClockEvent.objects.filter(user=self.user).count(), 1)
+
+    @override_settings(ATTENDANCE_SYNC_MAX_AGE_HOURS=12)
+    def test_events_older_than_the_sync_window_are_rejected(self):
+        results = self.sync([
+            {'action': 'clock_in', 'timestamp': '2026-03-01T09:00:00', 'idempotency_key': 'd1'},
+            {'action': 'clock_in', 'timestamp': '2026-03-02T09:00:00', 'idempotency_key': 'd2'},
+        ], now=datetime(2026, 3, 2, 18, 0))
+        self.assertEqual([r['clock_status'] for r in results], ['rejected', 'confirmed'])
+        self.assertIn('too old', results[0]['detail'])
+        self.assertFalse(ClockEvent.objects.filter(user=self.user, idempotency_key__endswith=':d1').exists())
+        self.assertEqual(AttendanceRecord.objects.get(user=self.user).date, date(2026, 3, 2))
+
+
+class CloseStaleAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='forgetful@example.com', password='secret', user_type='2',
+            first_name='Forgot', last_name='Clockout',
+        )
+
+    def record(self, days_ago, start, **fields):
+        day = timezone.now().date() - timedelta(days=days_ago)
+        return AttendanceRecord.objects.create(
+            user=self.user, date=day, clock_in=datetime.combine(day, start), **fields
+        )
+
+    def test_open_records_of_past_days_are_closed_in_bulk(self):
+        full_day = self.record(1, time(9, 0), notes='Left early')
+        half_day = self.record(2, time(14, 0), status='half_day')
+        closed = self.record(3, time(9, 0))
+        closed.clock_out = closed.clock_in + timedelta(hours=6)
+        closed.save()
+        today = self.record(0, time(0, 0))
+        cache.set(ATTENDANCE_STATE_KEY.format(self.user.id), {'stale': True})
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(5):
+            call_command('close_stale_attendance', stdout=StringIO())
+
+        note = f"Auto-logged out on {timezone.now().date()} due to missed clock-out"
+        full_day.refresh_from_db()
+        self.assertEqual(full_day.clock_out, full_day.clock_in + timedelta(hours=8))
+        self.assertEqual(full_day.total_worked, timedelta(hours=8))
+        self.assertEqual(full_day.notes, f"Left early\n{note}")
+        half_day.refresh_from_db()
+        self.assertEqual(half_day.clock_out, half_day.clock_in + timedelta(hours=4, minutes=30))
+        self.assertEqual(half_day.notes, note)
+
+        for untouched in (closed, today):
+            before = (untouched.clock_out, untouched.notes)
+            untouched.refresh_from_db()
+            self.assertEqual((untouched.clock_out, untouched.notes), before)
+        self.assertIsNone(cache.get(ATTENDANCE_STATE_KEY.format(self.user.id)))
+
+
+class ClockEventQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Engineering')
+        department = Department.objects.create(name='Backend', division=division)
+        cls.user = CustomUser.objects.create_user(
+            email='early@example.com', password='secret', user_type='3',
+            first_name='Early', last_name='Bird',
+        )
+        Employee.objects.create(
+            admin=cls.user, division=division, department=department,
+            designation='Developer', phone_number='9999999999',
+        )
+
+    def setUp(self):
+        self.addCleanup(activity_feed_buffer.flush)
+
+    def test_rejected_clock_in_is_retried_later_that_day(self):
+        event, created = enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 2, 8, 40))
+        process_pending_events()
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'rejected')
+
+        retried, created = enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 2, 8, 50), notes='late bus')
+        self.assertTrue(created)
+        self.assertEqual((retried.pk, retried.status, retried.result), (event.pk, 'pending', ''))
+        self.assertEqual(retried.payload, {'notes': 'late bus'})
+        process_pending_events()
+        retried.refresh_from_db()
+        self.assertEqual(retried.status, 'applied')
+        self.assertEqual(retried.attendance_record.clock_in, datetime(2026, 3, 2, 8, 50))
+
+        # Once applied, the day's clock-in is a plain duplicate
+        again, created = enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 2, 9, 0))
+        self.assertFalse(created)
+        self.assertEqual(again.status, 'applied')
+
+    def test_unexpected_error_rejects_only_that_event(self):
+        poisoned, _ = enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 2, 9, 0))
+        # A payload clock_in() does not accept, as a broken row or a bug would look
+        ClockEvent.objects.filter(pk=poisoned.pk).update(payload={'unexpected': 1})
+        healthy, _ = enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 3, 9, 0))
+
+        with self.assertLogs('main_app.utils.clock_events', 'ERROR'):
+            self.assertEqual(process_pending_events(), 2)
+        poisoned.refresh_from_db()
+        healthy.refresh_from_db()
+        self.assertEqual(poisoned.status, 'rejected')
+        self.assertIn('TypeError', poisoned.result)
+        self.assertEqual(healthy.status, 'applied')
+        self.assertEqual(process_pending_events(), 0)
+
+    def test_rejected_event_with_a_client_key_replays(self):
+        enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 2, 8, 40), idempotency_key='c1')
+        process_pending_events()
+        event, created = enqueue_clock_event(self.user.id, 'clock_in', datetime(2026, 3, 2, 8, 50), idempotency_key='c1')
+        self.assertFalse(created)
+        self.assertEqual(event.status, 'rejected')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='kiosk@example.com', password='secret', user_type='1',
+            first_name='Front', last_name='Desk',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token, self.plain = create_api_token(self.user, 'Lobby kiosk')
+
+    def authenticate(self, plain):
+        request = RequestFactory().post('/', HTTP_AUTHORIZATION=f'Token {plain}')
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_verified_token_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(self.plain)[0], self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(self.plain)[0], self.user)
+
+    def test_revoked_token_is_rejected_at_once(self):
+        self.authenticate(self.plain)
+        self.token.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.plain)
+
+    def test_attendance_api_is_reachable_with_a_token(self):
+        url = reverse('clock_in_out_api')
+        self.assertEqual(self.client.post(url, {'action': 'clockout'}).status_code, 401)
+
+        response = self.client.post(url, {'action': 'clockout'}, HTTP_AUTHORIZATION=f'Token {self.plain}')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'You are not clocked in'})
+
+
+class BreakDateIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(
+            email='breaks@example.com', password='secret', user_type='3',
+            first_name='Break', last_name='Taker',
+        )
+        record = AttendanceRecord.objects.create(
+            user=user, date=date(2026, 3, 2), clock_in=datetime(2026, 3, 2, 9, 0)
+        )
+        cls.lunch = Break.objects.create(
+            attendance_record=record, break_start=datetime(2026, 3, 2, 13, 0), break_type='lunch'
+        )
+
+    def test_date_is_set_from_break_start(self):
+        self.assertEqual(self.lunch.date, date(2026, 3, 2))
+
+    def test_ongoing_break_filters_use_the_date_index(self):
+        plans = [
+            Break.objects.filter(date=date(2026, 3, 2), break_end__isnull=True).explain(),
+            Break.objects.filter(date__gte=date(2026, 3, 1), date__lte=date(2026, 3, 31)).explain(),
+        ]
+        for plan in plans:
+            self.assertIn('break_date_end', plan)
+
+
+class ClockOutEligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Engineering')
+        department = Department.objects.create(name='Backend', division=division)
+        cls.user = CustomUser.objects.create_user(
+            email='eligible@example.com', password='secret', user_type='3',
+            first_name='Eligible', last_name='Employee',
+        )
+        cls.employee = Employee.objects.create(
+            admin=cls.user, division=division, department=department,
+            designation='Developer', phone_number='9999999999',
+        )
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        AttendanceRecord.objects.create(
+            user=self.user, date=self.today, clock_in=datetime.combine(self.today, datetime.min.time())
+        )
+
+    def eligibility(self):
+        return ClockOutEligibility.objects.get(user=self.user, date=self.today)
+
+    def test_schedule_and_update_signals_maintain_the_flags(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = DailySchedule.objects.create(employee=self.employee, date=self.today, task_description='Work')
+        self.assertTrue(self.eligibility().has_schedule)
+        self.assertFalse(self.eligibility().update_submitted)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyUpdate.objects.create(schedule=schedule, update_description='Done')
+        self.assertTrue(self.eligibility().update_submitted)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.delete()
+        self.assertFalse(self.eligibility().has_schedule)
+        self.assertFalse(self.eligibility().update_submitted)
+
+    def test_clock_out_reads_the_stored_flags(self):
+        now = datetime.combine(self.today, datetime.max.time())
+        with self.assertRaisesMessage(ClockInError, 'No schedule found for today'):
+            clock_out(self.user.id, now)
+
+        ClockOutEligibility.objects.create(user=self.user, date=self.today, has_schedule=True, update_submitted=True)
+        record = clock_out(self.user.id, now)
+        self.assertEqual(record.clock_out, now)
+
+    def test_reading_an_untouched_day_does_not_write(self):
+        with self.assertNumQueries(2):
+            eligibility = get_clock_out_eligibility(self.user.id, self.today)
+        self.assertFalse(eligibility.has_schedule)
+        self.assertIsNone(eligibility.pk)
+        self.assertFalse(ClockOutEligibility.objects.filter(user=self.user).exists())
+
+
+class IdempotentViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='clicker@example.com', password='secret', user_type='3',
+            first_name='Double', last_name='Clicker',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @idempotent
+        def view(request):
+            self.calls += 1
+            return JsonResponse({'call': self.calls})
+        self.view = view
+
+    def post(self, body='{}', **headers):
+        request = RequestFactory().post('/action/', body, content_type='application/json', headers=headers)
+        request.user = self.user
+        return self.view(request)
+
+    def test_repeated_key_replays_the_stored_response(self):
+        first = self.post(body='{"a": 1}', Idempotency_Key='k1')
+        replayed = self.post(body='{"a": 2}', Idempotency_Key='k1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(replayed.content, first.content)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+
+        self.post(Idempotency_Key='k2')
+        self.assertEqual(self.calls, 2)
+
+    def test_identical_body_without_key_is_a_double_click(self):
+        self.post()
+        self.post()
+        self.assertEqual(self.calls, 1)
+        self.post(body='{"other": true}')
+        self.assertEqual(self.calls, 2)
+
+    def test_duplicate_during_a_form_post_redirects_with_a_message(self):
+        @idempotent(in_progress_redirect='employee_apply_leave')
+        def form_view(request):
+            # The same POST arriving while this one is still running
+            self.inner = form_view(request)
+            return JsonResponse({})
+
+        request = RequestFactory().post('/leave/', {'reason': 'trip'})
+        request.user = self.user
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        form_view(request)
+
+        self.assertEqual(self.inner.status_code, 302)
+        self.assertEqual(self.inner['Location'], reverse('employee_apply_leave'))
+        self.assertEqual([str(m) for m in request._messages], ['This request is already being processed.'])
+
+
+class FaceIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(
+                email=f'face{i}@example.com', password='secret', user_type='3',
+                first_name=f'Face{i}', last_name='Employee',
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(FACE_INDEX_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def enroll(self, user, encoding):
+        with self.captureOnCommitCallbacks(execute=True):
+            FaceProfile.objects.create(
+                employee=user, face_image='face_profiles/x.jpg', face_encoding=encoding.tobytes()
+            )
+
+    def test_best_match_wins_over_first_match(self):
+        base = np.zeros(128)
+        self.enroll(self.users[0], base + 0.03)
+        self.enroll(self.users[1], base + 0.01)
+        self.enroll(self.users[2], base + 1.0)
+
+        user, distance = get_face_index().match(base)
+        self.assertEqual(user['id'], self.users[1].id)
+        self.assertAlmostEqual(distance, np.sqrt(128) * 0.01, places=5)
+        self.assertIsNone(get_face_index().match(base - 1.0))
+
+    def test_snapshot_is_reopened_only_after_a_change(self):
+        self.enroll(self.users[0], np.zeros(128))
+        index = get_face_index()
+        self.assertIsInstance(index.encodings, np.memmap)
+        self.assertEqual(index.encodings.dtype, np.float32)
+        with self.assertNumQueries(0):
+            self.assertIs(get_face_index(), index)
+
+        self.enroll(self.users[1], np.ones(128))
+        self.assertEqual(len(get_face_index()), 2)
+
+    def test_snapshot_cleanup_leaves_other_files_alone(self):
+        unrelated = os.path.join(self.directory, 'photo.jpg')
+        open(unrelated, 'w').close()
+        for i, user in enumerate(self.users):
+            self.enroll(user, np.full(128, i, dtype=np.float64))
+        self.assertTrue(os.path.exists(unrelated))
+        # The current and previous snapshots are kept, older ones removed
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.startswith('encodings-')]), 2)
+
+    def test_bulk_enrolment_writes_one_snapshot(self):
+        with mock.patch('main_app.utils.face_index.write_face_snapshot', wraps=write_face_snapshot) as write:
+            with batched_face_snapshot():
+                for i, user in enumerate(self.users):
+                    self.enroll(user, np.full(128, i, dtype=np.float64))
+                write.assert_not_called()
+        write.assert_called_once()
+        self.assertEqual(len(get_face_index()), 3)
+
+
+class FaceEnrollmentJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='enroll@example.com', password='secret', user_type='3',
+            first_name='New', last_name='Starter',
+        )
+
+    def setUp(self):
+        for setting in ('MEDIA_ROOT', 'FACE_INDEX_DIR'):
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            settings_override = override_settings(**{setting: directory.name})
+            settings_override.enable()
+            self.addCleanup(settings_override.disable)
+
+    def queue(self):
+        # The pool is only handed the job on commit, which never happens here
+        return queue_face_enrollment(self.user, SimpleUploadedFile('face.jpg', b'jpeg'))
+
+    def test_job_encodes_once_and_refreshes_the_index(self):
+        job = self.queue()
+        encoding = np.ones(128)
+        with mock.patch('main_app.utils.face_enrollment.encode_face_image', return_value=encoding.tobytes()) as encode, \
+                mock.patch('main_app.models.face_recognition') as model_encoder, \
+                self.captureOnCommitCallbacks(execute=True):
+            run_enrollment_job(job.pk)
+            run_enrollment_job(job.pk)
+
+        encode.assert_called_once()
+        model_encoder.face_encodings.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(FaceProfile.objects.get(employee=self.user).face_encoding, encoding.tobytes())
+        self.assertEqual(get_face_index().match(encoding)[0]['id'], self.user.id)
+
+    def test_photo_without_a_face_fails_the_job(self):
+        job = self.queue()
+        with mock.patch('main_app.utils.face_enrollment.encode_face_image', return_value=None):
+            run_enrollment_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'No face detected'))
+        self.assertFalse(FaceProfile.objects.filter(employee=self.user).exists())
+
+
+class FramePreprocessingTests(TestCase):
+    def test_select_face(self):
+        boxes = [(10, 60, 60, 10), (40, 130, 160, 10), (90, 110, 110, 90)]
+        self.assertEqual(select_face(boxes, (200, 200), 'largest'), boxes[1])
+        self.assertEqual(select_face(boxes, (200, 200), 'center'), boxes[2])
+
+    def test_frame_is_downscaled_and_timed(self):
+        frame = np.full((720, 1280, 3), 255, dtype=np.uint8)
+        image_bytes = cv2.imencode('.jpg', frame)[1].tobytes()
+        timer = StageTimer()
+        with mock.patch('main_app.utils.face_preprocess.face_recognition.face_locations', return_value=[]) as detect:
+            self.assertIsNone(encode_frame(image_bytes, timer))
+
+        detected = detect.call_args.args[0]
+        self.assertEqual(detected.shape, (270, 480, 3))
+        self.assertEqual(list(timer.timings), ['decode', 'resize', 'convert', 'detect'])
+        self.assertTrue(timer.server_timing().startswith('decode;dur='))
+
+
+class FaceMatcherTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.gallery = rng.normal(0, 0.1, (2000, 128)).astype(np.float32)
+        self.queries = self.gallery[:50] + rng.normal(0, 0.01, (50, 128)).astype(np.float32)
+
+    def test_ivf_probing_every_cell_is_exact(self):
+        exact = BruteForceMatcher(self.gallery)
+        ivf = IVFMatcher(self.gallery, n_lists=20, n_probe=20)
+        for query in self.queries:
+            self.assertEqual(ivf.search(query, 0.5), exact.search(query, 0.5))
+
+    def test_ivf_finds_close_captures(self):
+        ivf = IVFMatcher(self.gallery, n_lists=40, n_probe=4)
+        rows = [ivf.search(query, 0.5)[0] for query in self.queries]
+        self.assertEqual(rows, list(range(50)))
+        self.assertIsNone(ivf.search(self.queries[0] + 1.0, 0.5))
+
+    def test_build_matcher_from_config(self):
+        config = {'matcher': 'ivf', 'ivf_lists': 10, 'ivf_probe': 3}
+        matcher = build_matcher(self.gallery, config)
+        self.assertEqual((matcher.n_lists, matcher.n_probe), (10, 3))
+        self.assertIsNone(build_matcher(np.empty((0, 128), np.float32), config).search(self.queries[0], 0.5))
+        with self.assertRaises(ValueError):
+            build_matcher(self.gallery, {'matcher': 'annoy'})
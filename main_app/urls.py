@@ -84,7 +84,6 @@ urlpatterns = [
           ceo_views.edit_department, name='edit_department'),
      path('generate_performance_report',ceo_views.generate_performance_report,name='generate_performance_report'),
      path('get_department_data' , ceo_views.get_department_data,name="get_department_data"),
-     path('api/attendance/clock/', ceo_views.admin_view_attendance),
 
      path('admin_asset_issue_history/',ceo_views.admin_asset_issue_history,name="admin_asset_issue_history"),
      
@@ -93,8 +92,10 @@ urlpatterns = [
      path('get_holidays/', ceo_views.get_holidays, name='get_holidays'),
      path('clock-in-out/', views.clock_in_out, name='clock_in_out'),
      path('break/', views.break_action, name='break_action'),
+     path('clock-events/<str:event_id>/', views.clock_event_status, name='clock_event_status'),
 
      path('api/attendance/clock/', views.AttendanceActionView.as_view(), name='clock_in_out_api'),
+     path('api/attendance/sync/', views.ClockEventSyncView.as_view(), name='clock_event_sync_api'),
      path("get_employee_attendance_by_admin/", ceo_views.get_manager_and_employee_attendance, name='get_manager_and_employee_attendance'),
 
      path("admin/view/notification/", ceo_views.admin_view_notification,name="admin_view_notification"),
@@ -199,6 +200,7 @@ urlpatterns = [
  
  
      path('register_face/', views.register_face, name='register_face'),
+     path('register_face/jobs/<int:job_id>/', views.face_enrollment_status, name='face_enrollment_status'),
      path('open-camera/', views.open_camera, name='open_camera'),
      path('recognize_face/', views.recognize_face, name='recognize_face'),
     
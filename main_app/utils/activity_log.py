@@ -0,0 +1,87 @@
+import atexit
+import logging
+import threading
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from main_app.models import ActivityFeed
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityFeedBuffer:
+    """
+    Per-process write-behind buffer for ActivityFeed rows.
+
+    Entries join the buffer when the surrounding transaction commits (and are
+    dropped if it rolls back), then go to the database in one bulk_create
+    once ``max_size`` entries are waiting or the oldest one is ``max_age``
+    seconds old. Whatever is left is flushed when the process exits.
+
+    ``timer`` builds the age timer (``threading.Timer`` by default); tests pass
+    a stand-in so the age flush can be fired without waiting.
+    """
+
+    def __init__(self, max_size=50, max_age=5.0, timer=threading.Timer):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timer = timer
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        atexit.register(self.flush)
+
+    def add(self, **fields):
+        # Stamp now: the row may only be written a few seconds later
+        fields.setdefault('timestamp', timezone.now())
+        entry = ActivityFeed(**fields)
+        transaction.on_commit(lambda: self._append(entry))
+
+    def _append(self, entry):
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_size
+            if not full and self._timer is None:
+                self._timer = self.timer(self.max_age, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connection
+            connection.close()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return
+        try:
+            # Savepoint, so a failed insert does not break a caller's transaction
+            with transaction.atomic():
+                ActivityFeed.objects.bulk_create(batch)
+        except DatabaseError:
+            # One bad row (e.g. its record was deleted meanwhile) must not lose the rest
+            logger.exception("Bulk ActivityFeed insert failed, retrying row by row")
+            for entry in batch:
+                try:
+                    with transaction.atomic():
+                        entry.save(force_insert=True)
+                except DatabaseError:
+                    logger.exception(f"Dropped ActivityFeed entry {entry.activity_type} for user {entry.user_id}")
+
+
+activity_feed_buffer = ActivityFeedBuffer()
+
+
+def log_activity(**fields):
+    """Record an ActivityFeed entry without a database round trip in the request."""
+    activity_feed_buffer.add(**fields)
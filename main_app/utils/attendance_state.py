@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from main_app.models import AttendanceRecord, Employee
+
+from .clock_out_eligibility import employee_clock_out_error, get_clock_out_eligibility
+from .versioned_cache import cache_timeout
+
+
+ATTENDANCE_STATE_KEY = 'attendance_state:{}'
+# Invalidation only reaches the cache of the worker that made the write, so
+# without a shared cache the state is kept for a few seconds (see cache_timeout)
+ATTENDANCE_STATE_TIMEOUT = 60 * 60 * 24
+OPEN_RECORD_STATUSES = ['present', 'late', 'half_day']
+
+
+def build_attendance_state(user_id):
+    """
+    Read the header timer's attendance state from the database.
+
+    The state only holds plain values so it can be cached:
+    latest -- id, date, clock_in and status of the latest record
+    open_record -- the same for the open clock-in record, if any
+    open_break -- break_start and break_type of the latest record's open break
+    early_clock_out_approved -- an approved early clock-out exists for the open record
+    clock_out_blocked_reason -- why an employee may not clock out of the open record yet
+    """
+    fields = ('id', 'date', 'clock_in', 'status')
+    latest = (
+        AttendanceRecord.objects.filter(user_id=user_id)
+        .order_by('-clock_in')
+        .values(*fields, 'open_break__break_start', 'open_break__break_type').first()
+    )
+    open_record = (
+        AttendanceRecord.objects.filter(
+            user_id=user_id, clock_out__isnull=True, status__in=OPEN_RECORD_STATUSES
+        ).order_by('-date').values(*fields).first()
+    )
+
+    state = {
+        'latest': latest,
+        'open_record': open_record,
+        'open_break': None,
+        'early_clock_out_approved': False,
+        'clock_out_blocked_reason': None,
+    }
+    if latest:
+        open_break_start = latest.pop('open_break__break_start')
+        open_break_type = latest.pop('open_break__break_type')
+        if open_break_start:
+            state['open_break'] = {
+                'break_start': open_break_start,
+                'break_type': open_break_type,
+            }
+    if open_record:
+        eligibility = get_clock_out_eligibility(user_id, open_record['date'])
+        state['early_clock_out_approved'] = eligibility.early_clock_out_approved
+        if Employee.objects.filter(admin_id=user_id).exists():
+            state['clock_out_blocked_reason'] = employee_clock_out_error(eligibility)
+    return state
+
+
+def get_attendance_state(user_id):
+    key = ATTENDANCE_STATE_KEY.format(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = build_attendance_state(user_id)
+        cache.set(key, state, cache_timeout(ATTENDANCE_STATE_TIMEOUT))
+    return state
+
+
+def invalidate_attendance_state(user_ids):
+    """
+    Drop the cached state of the given users once the current write commits.
+    The next get_attendance_state() rebuilds it, so writes never pay for the
+    rebuild and several writes in one transaction cost a single delete.
+    """
+    keys = [ATTENDANCE_STATE_KEY.format(user_id) for user_id in set(user_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
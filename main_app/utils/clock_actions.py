@@ -0,0 +1,101 @@
+from django.core.exceptions import ValidationError
+
+from main_app.models import AttendanceRecord, Break
+
+from .activity_log import log_activity
+from .clock_in import ClockInError
+from .clock_out_eligibility import employee_clock_out_error, get_clock_out_eligibility
+
+
+NOT_CLOCKED_IN = 'You must be clocked in to take a break'
+
+
+def open_record_for(user_id, today):
+    return (
+        AttendanceRecord.objects.select_related('user__employee', 'user__manager', 'open_break')
+        .filter(user_id=user_id, date=today, clock_out__isnull=True)
+        .first()
+    )
+
+
+def clock_out(user_id, now, notes=''):
+    """
+    Clock a user out of today's open record and return it.
+
+    Employees must have today's schedule and a submitted update first, as
+    recorded in their ClockOutEligibility row; managers may clock out at any
+    time.
+    """
+    today = now.date()
+    record = open_record_for(user_id, today)
+    if not record:
+        raise ClockInError('No active clock-in record found to clock out.', code='not_clocked_in')
+
+    user = record.user
+    if getattr(user, 'employee', None):
+        error = employee_clock_out_error(get_clock_out_eligibility(user.id, today))
+        if error:
+            raise ClockInError(error)
+    elif not getattr(user, 'manager', None):
+        raise ClockInError('Invalid request.')
+
+    record.clock_out = now
+    record.notes = notes
+    try:
+        record.clean()
+    except ValidationError as e:
+        raise ClockInError(' '.join(e.messages))
+    record.save()
+
+    log_activity(
+        user=user,
+        activity_type='clock_out',
+        related_record=record
+    )
+    return record
+
+
+def start_break(user_id, now, break_type='short'):
+    """Start a break on today's open record and return the record."""
+    record = open_record_for(user_id, now.date())
+    if not record:
+        raise ClockInError(NOT_CLOCKED_IN, code='not_clocked_in')
+    if break_type not in dict(Break.BREAK_TYPE_CHOICES):
+        raise ClockInError(f"Unknown break type '{break_type}'.")
+    if record.open_break:
+        raise ClockInError('A break is already in progress.', code='break_in_progress')
+    if break_type == 'lunch' and record.lunch_taken:
+        raise ClockInError('You have already taken your lunch break today.', code='lunch_taken')
+
+    Break.objects.create(
+        attendance_record=record,
+        break_start=now,
+        break_type=break_type
+    )
+    log_activity(
+        user_id=user_id,
+        activity_type='break_start_short' if break_type == 'short' else 'break_start_lunch',
+        related_record=record
+    )
+    return record
+
+
+def end_break(user_id, now):
+    """End the open break on today's open record and return the record."""
+    record = open_record_for(user_id, now.date())
+    if not record:
+        raise ClockInError(NOT_CLOCKED_IN, code='not_clocked_in')
+    current_break = record.open_break
+    if not current_break:
+        raise ClockInError('No break is in progress.', code='no_break')
+    if now < current_break.break_start:
+        raise ClockInError('A break cannot end before it started.')
+
+    current_break.break_end = now
+    current_break.save()
+    log_activity(
+        user_id=user_id,
+        activity_type='break_end',
+        related_record=record
+    )
+    return record
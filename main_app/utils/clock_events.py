@@ -0,0 +1,219 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from main_app.models import ClockEvent
+
+from .clock_actions import clock_out, end_break, start_break
+from .clock_in import ClockInError, clock_in
+
+
+logger = logging.getLogger(__name__)
+
+# Largest batch accepted by the sync endpoint
+MAX_SYNC_EVENTS = 100
+# Client clocks may run slightly ahead of the server
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+# Oldest event the sync endpoint accepts, unless ATTENDANCE_SYNC_MAX_AGE_HOURS says otherwise
+DEFAULT_MAX_SYNC_AGE = timedelta(hours=24)
+# Payload keys kept for each action, with their defaults
+ACTION_PAYLOAD = {
+    'clock_in': {'notes': '', 'clock_in_type': 'sync'},
+    'clock_out': {'notes': ''},
+    'break_start': {'break_type': 'short'},
+    'break_end': {},
+}
+
+# Response status reported to clients for each ClockEvent status
+CLIENT_STATUS = {
+    'pending': 'pending',
+    'applied': 'confirmed',
+    'rejected': 'rejected',
+}
+
+
+def clock_queue_enabled():
+    return getattr(settings, 'ATTENDANCE_CLOCK_QUEUE', False)
+
+
+def max_sync_age():
+    hours = getattr(settings, 'ATTENDANCE_SYNC_MAX_AGE_HOURS', None)
+    return DEFAULT_MAX_SYNC_AGE if hours is None else timedelta(hours=hours)
+
+
+def default_idempotency_key(user_id, action, occurred_at):
+    # A user clocks in once a day, so retries and double clicks share this key
+    return f"{action}:{user_id}:{occurred_at.date().isoformat()}"
+
+
+def enqueue_clock_event(user_id, action, occurred_at, idempotency_key=None, **payload):
+    """
+    Append a clock event to the queue and return (event, created).
+
+    A repeated idempotency key returns the existing event instead of adding a
+    second one, so its status can be reported back to the client.
+
+    The default key covers the whole day, so a later attempt after a
+    rejection (say, a clock-in before 8:45) is a new try rather than a retry:
+    the rejected event is reset to pending with the new time and payload and
+    returned as created. A client key names one attempt and always replays.
+    """
+    if idempotency_key:
+        # Client keys are only unique per user
+        key = f"{user_id}:{idempotency_key}"
+    else:
+        key = default_idempotency_key(user_id, action, occurred_at)
+    try:
+        with transaction.atomic():
+            event = ClockEvent.objects.create(
+                idempotency_key=key,
+                user_id=user_id,
+                action=action,
+                occurred_at=occurred_at,
+                payload=payload,
+            )
+        return event, True
+    except IntegrityError:
+        pass
+
+    # Conditional, so two concurrent attempts cannot both reopen the event
+    reopened = not idempotency_key and ClockEvent.objects.filter(idempotency_key=key, status='rejected').update(
+        status='pending',
+        occurred_at=occurred_at,
+        payload=payload,
+        result='',
+        attendance_record=None,
+        processed_at=None,
+    )
+    return ClockEvent.objects.get(idempotency_key=key), bool(reopened)
+
+
+def apply_clock_event(event):
+    """Apply one event. Raises ClockInError when the event is refused."""
+    if event.action == 'clock_in':
+        return clock_in(event.user_id, event.occurred_at, **event.payload)
+    if event.action == 'clock_out':
+        return clock_out(event.user_id, event.occurred_at, **event.payload)
+    if event.action == 'break_start':
+        return start_break(event.user_id, event.occurred_at, **event.payload)
+    if event.action == 'break_end':
+        return end_break(event.user_id, event.occurred_at)
+    raise ClockInError(f"Unsupported clock event '{event.action}'.")
+
+
+def run_clock_event(event, now):
+    """
+    Apply ``event`` in a savepoint and record the outcome on it (unsaved).
+
+    Any error rolls back the savepoint only and rejects the event, so one
+    broken event cannot undo its batch or stay at the head of the queue.
+    """
+    try:
+        with transaction.atomic():
+            record = apply_clock_event(event)
+        event.status = 'applied'
+        event.attendance_record = record
+        event.result = ''
+    except ClockInError as e:
+        event.status = 'rejected'
+        event.result = e.message
+    except Exception as e:
+        logger.exception(f"Clock event {event.pk} ({event.action} for user {event.user_id}) failed")
+        event.status = 'rejected'
+        event.result = f"Could not apply the clock event ({type(e).__name__}: {e})"
+    event.processed_at = now
+
+
+def process_pending_events(batch_size=200):
+    """
+    Apply up to ``batch_size`` pending events in one transaction and return
+    how many were processed. Each event runs in its own savepoint, so a
+    refused event is recorded without undoing the rest of the batch.
+    """
+    with transaction.atomic():
+        events = list(ClockEvent.objects.filter(status='pending').order_by('id')[:batch_size])
+        now = timezone.now()
+        for event in events:
+            run_clock_event(event, now)
+        ClockEvent.objects.bulk_update(events, ['status', 'attendance_record', 'result', 'processed_at'])
+    return len(events)
+
+
+def clock_event_response(event):
+    """Fields added to a clock endpoint's JSON response for a queued event."""
+    return {
+        'clock_status': CLIENT_STATUS[event.status],
+        'event_id': event.idempotency_key,
+        'detail': event.result,
+    }
+
+
+def parse_sync_event(item, now):
+    """
+    Validate one uploaded event and return (action, occurred_at, key, payload).
+    Raises ClockInError describing the first problem found.
+    """
+    if not isinstance(item, dict):
+        raise ClockInError('Each event must be an object.')
+    action = item.get('action')
+    if action not in ACTION_PAYLOAD:
+        raise ClockInError(f"Unsupported clock event '{action}'.")
+    key = item.get('idempotency_key')
+    if not isinstance(key, str) or not key or len(key) > 64:
+        raise ClockInError('idempotency_key must be a non-empty string of at most 64 characters.')
+
+    occurred_at = parse_datetime(item['timestamp']) if isinstance(item.get('timestamp'), str) else None
+    if occurred_at is None:
+        raise ClockInError('timestamp must be an ISO 8601 date and time.')
+    if timezone.is_aware(occurred_at):
+        occurred_at = timezone.make_naive(occurred_at)
+    if occurred_at > now + MAX_CLOCK_SKEW:
+        raise ClockInError('timestamp is in the future.')
+    # Without a lower bound any user could backfill attendance for past days
+    if occurred_at < now - max_sync_age():
+        raise ClockInError('timestamp is too old to sync; ask your manager to correct the record.')
+
+    payload = {
+        field: item.get(field, default)
+        for field, default in ACTION_PAYLOAD[action].items()
+    }
+    return action, occurred_at, key, payload
+
+
+def sync_clock_events(user_id, items, now=None):
+    """
+    Apply an ordered batch of client-recorded clock events in one transaction
+    and return one result per item, in the same order.
+
+    Events are validated against the same leave, shift and schedule rules as
+    the live endpoints, using the client timestamp. A refused event does not
+    undo the rest of the batch. Replaying a batch is safe: an idempotency key
+    seen before reports the stored outcome instead of applying the event again.
+    Events more than max_sync_age() before ``now`` are refused.
+    """
+    now = now or timezone.now()
+    results = []
+    with transaction.atomic():
+        for item in items:
+            key = item.get('idempotency_key') if isinstance(item, dict) else None
+            try:
+                action, occurred_at, key, payload = parse_sync_event(item, now)
+            except ClockInError as e:
+                results.append({'idempotency_key': key, 'clock_status': 'rejected', 'detail': e.message})
+                continue
+
+            event, created = enqueue_clock_event(user_id, action, occurred_at, idempotency_key=key, **payload)
+            if created:
+                run_clock_event(event, now)
+                event.save(update_fields=['status', 'attendance_record', 'result', 'processed_at'])
+            results.append({
+                'idempotency_key': key,
+                'clock_status': CLIENT_STATUS[event.status],
+                'detail': event.result,
+                'duplicate': not created,
+            })
+    return results
@@ -0,0 +1,135 @@
+from datetime import datetime, time
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Subquery
+
+from main_app.models import AttendanceRecord, CustomUser, LeaveReportEmployee, LeaveReportManager
+
+from .activity_log import log_activity
+
+
+class ClockInError(Exception):
+    """A clock-in that was refused; ``message`` is safe to show to the user."""
+
+    def __init__(self, message, code='invalid'):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+ALREADY_CLOCKED_IN = 'You are already clocked in for today.'
+
+
+def load_clock_in_user(user_id, today):
+    """
+    Fetch the user, their Employee/Manager row and today's leave and
+    attendance state in a single query.
+    """
+    employee_leave = LeaveReportEmployee.objects.filter(
+        employee__admin=OuterRef('pk'),
+        start_date__lte=today,
+        end_date__gte=today,
+        status=1
+    ).order_by('pk')
+    manager_leave = LeaveReportManager.objects.filter(
+        manager__admin=OuterRef('pk'),
+        start_date__lte=today,
+        end_date__gte=today,
+        status=1
+    ).order_by('pk')
+    return (
+        CustomUser.objects.select_related('employee', 'manager')
+        .annotate(
+            has_record_today=Exists(AttendanceRecord.objects.filter(user=OuterRef('pk'), date=today)),
+            leave_type=Subquery(employee_leave.values('leave_type')[:1]),
+            leave_half_day_type=Subquery(employee_leave.values('half_day_type')[:1]),
+            manager_leave_type=Subquery(manager_leave.values('leave_type')[:1]),
+        )
+        .get(pk=user_id)
+    )
+
+
+def attendance_status(user, now, today):
+    """Validate the clock-in time against leave and shift rules and return the record status."""
+    current_time = now.time()
+    if user.leave_type:
+        if user.leave_type == 'Full-Day':
+            raise ClockInError('Cannot clock in on an approved leave day.')
+
+        # For first half leave, allow clock-in only after 1:00 pm
+        if user.leave_half_day_type == 'First Half' and current_time < time(13, 0):
+            raise ClockInError('For First Half leave, you can only clock in after 1:00 PM.')
+
+        # For Second Half leave, allow clock-in only before 1:00 PM
+        if user.leave_half_day_type == 'Second Half' and current_time >= time(13, 0):
+            raise ClockInError('For Second Half leave, you must clock in before 1:00 PM.')
+
+    if user.manager_leave_type == 'Full-Day':
+        raise ClockInError('Cannot clock in on an approved leave day.')
+
+    if user.is_second_shift:
+        # Default status for second shift users
+        if user.manager_leave_type == 'Half-Day':
+            return 'half_day'
+        return 'present'
+
+    late_threshold = datetime.combine(today, time(9, 30))
+    half_day_threshold = datetime.combine(today, time(13, 0))
+    earliest_clock_in = datetime.combine(today, time(8, 45)) if user.user_type == "3" else datetime.combine(today, time(8, 30))
+
+    if now < earliest_clock_in:
+        raise ClockInError(
+            f"Clock-in is not allowed before {'8:45 AM' if user.user_type == '3' else '8:30 AM'} IST."
+        )
+
+    if now > half_day_threshold or user.leave_type:
+        return 'half_day'
+    if now > late_threshold:
+        return 'late'
+    return 'present'
+
+
+def clock_in(user_id, now, ip_address=None, notes='', clock_in_type='manual'):
+    """
+    Clock a user in and return the new AttendanceRecord.
+
+    Raises ClockInError when the clock-in is not allowed. A second open
+    record for the same day is rejected by the one_open_attendance_per_day
+    constraint; the ActivityFeed entry is written behind once this commits.
+    """
+    today = now.date()
+    user = load_clock_in_user(user_id, today)
+    if user.has_record_today:
+        raise ClockInError(ALREADY_CLOCKED_IN, code='already_clocked_in')
+
+    status = attendance_status(user, now, today)
+    member = getattr(user, 'employee', None) or getattr(user, 'manager', None)
+    record = AttendanceRecord(
+        user=user,
+        date=today,
+        clock_in=now,
+        department_id=member.department_id if member else None,
+        status=status,
+        ip_address=ip_address,
+        notes=notes,
+        clock_in_type=clock_in_type,
+    )
+    # Field-level checks only; uniqueness is left to the database
+    try:
+        record.clean()
+    except ValidationError as e:
+        raise ClockInError(' '.join(e.messages))
+
+    try:
+        with transaction.atomic():
+            record.save(force_insert=True)
+    except IntegrityError:
+        raise ClockInError(ALREADY_CLOCKED_IN, code='already_clocked_in')
+
+    log_activity(
+        user=user,
+        activity_type='clock_in',
+        related_record=record
+    )
+    return record
@@ -0,0 +1,58 @@
+from django.db.models import Exists, OuterRef
+
+from main_app.models import ClockOutEligibility, CustomUser, DailySchedule, DailyUpdate, EarylyClockOutRequest
+
+
+def compute_clock_out_eligibility(user_id, day):
+    """Build the user's eligibility for ``day`` from the source tables, unsaved."""
+    flags = CustomUser.objects.filter(pk=user_id).annotate(
+        has_schedule=Exists(DailySchedule.objects.filter(employee__admin=OuterRef('pk'), date=day)),
+        update_submitted=Exists(DailyUpdate.objects.filter(
+            schedule__employee__admin=OuterRef('pk'),
+            schedule__date=day,
+            updated_at__date=day,
+        )),
+        early_clock_out_approved=Exists(EarylyClockOutRequest.objects.filter(
+            user=OuterRef('pk'), attendance_record__date=day, status='approved'
+        )),
+    ).values('has_schedule', 'update_submitted', 'early_clock_out_approved').first()
+    if flags is None:
+        # The user is being deleted
+        return None
+    return ClockOutEligibility(user_id=user_id, date=day, **flags)
+
+
+def refresh_clock_out_eligibility(user_id, day):
+    """Recompute and store the user's ClockOutEligibility row for ``day``. Called from signals."""
+    eligibility = compute_clock_out_eligibility(user_id, day)
+    if eligibility is None:
+        return None
+    eligibility, _ = ClockOutEligibility.objects.update_or_create(
+        user_id=user_id, date=day,
+        defaults={
+            'has_schedule': eligibility.has_schedule,
+            'update_submitted': eligibility.update_submitted,
+            'early_clock_out_approved': eligibility.early_clock_out_approved,
+        },
+    )
+    return eligibility
+
+
+def get_clock_out_eligibility(user_id, day):
+    """
+    Read the stored row. Days no signal has touched yet are computed in
+    memory, so page views never write; rows are only stored by signals.
+    """
+    eligibility = ClockOutEligibility.objects.filter(user_id=user_id, date=day).first()
+    if eligibility is None:
+        eligibility = compute_clock_out_eligibility(user_id, day)
+    return eligibility
+
+
+def employee_clock_out_error(eligibility):
+    """The reason an employee may not clock out yet, or None."""
+    if not eligibility.has_schedule:
+        return 'No schedule found for today. Cannot clock out without a schedule and update.'
+    if not eligibility.update_submitted:
+        return "Cannot clock out without submitting today's update."
+    return None
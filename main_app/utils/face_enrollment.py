@@ -0,0 +1,95 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import face_recognition
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from main_app.models import FaceEnrollmentJob, FaceProfile
+
+
+logger = logging.getLogger(__name__)
+
+NO_FACE_DETECTED = 'No face detected'
+
+_executor = None
+
+
+def enrollment_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'FACE_ENROLLMENT_WORKERS', 2),
+            thread_name_prefix='face-enrollment',
+        )
+    return _executor
+
+
+def queue_face_enrollment(employee, face_image, requested_by=None):
+    """
+    Store the photo as a FaceEnrollmentJob and hand it to the worker pool
+    once the request's transaction commits. Returns the job.
+    """
+    job = FaceEnrollmentJob.objects.create(employee=employee, face_image=face_image, requested_by=requested_by)
+    job_id = job.pk
+    transaction.on_commit(lambda: enrollment_executor().submit(_run_in_worker, job_id))
+    return job
+
+
+def encode_face_image(path):
+    image = face_recognition.load_image_file(path)
+    encodings = face_recognition.face_encodings(image)
+    return encodings[0].tobytes() if encodings else None
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_enrollment_job(job_id)
+    except Exception:
+        logger.exception(f"Face enrollment job {job_id} crashed")
+    finally:
+        # Pool threads keep their own connection
+        connection.close()
+
+
+def run_enrollment_job(job_id):
+    """Encode one queued job's photo and save it as the user's FaceProfile."""
+    # Claim the job, so a second worker or the command does not encode it again
+    if not FaceEnrollmentJob.objects.filter(pk=job_id, status='queued').update(status='running'):
+        return
+    job = FaceEnrollmentJob.objects.get(pk=job_id)
+    try:
+        encoding = encode_face_image(job.face_image.path)
+    except Exception as e:
+        logger.exception(f"Face enrollment job {job_id} failed")
+        encoding, error = None, str(e)
+    else:
+        error = '' if encoding else NO_FACE_DETECTED
+
+    if encoding:
+        with transaction.atomic():
+            # The encoding is already set, so FaceProfile.save() does not encode again;
+            # its post_save signal refreshes the face index on commit
+            FaceProfile.objects.update_or_create(
+                employee_id=job.employee_id,
+                defaults={'face_image': job.face_image.name, 'face_encoding': encoding},
+            )
+            job.status = 'done'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'finished_at'])
+    else:
+        job.status = 'failed'
+        job.error = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+
+
+def face_enrollment_response(job):
+    return {
+        'job_id': job.pk,
+        'status': job.status,
+        'error': job.error,
+        'email': job.employee.email,
+    }
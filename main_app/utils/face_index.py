@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from main_app.models import FaceProfile
+
+from .face_matchers import build_matcher
+from .face_preprocess import face_recognition_config
+
+
+logger = logging.getLogger(__name__)
+
+FACE_ENCODING_SIZE = 128
+
+# Snapshot layout in FACE_INDEX_DIR: CURRENT names the live version, and each
+# version has an encodings matrix, a user id sidecar and the display details.
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = '.lock'
+ENCODINGS_FILE = 'encodings-{}.npy'
+IDS_FILE = 'ids-{}.npy'
+USERS_FILE = 'users-{}.json'
+# Names write_face_snapshot() may remove; anything else in the directory is left alone
+SNAPSHOT_FILE_RE = re.compile('|'.join(
+    re.escape(name).replace(re.escape('{}'), r'\d+') for name in (ENCODINGS_FILE, IDS_FILE, USERS_FILE)
+))
+
+
+class FaceIndex:
+    """
+    All enrolled face encodings as one N x 128 matrix, with the matching
+    user ids and display details in row order, searched by the matcher
+    chosen in the FACE_RECOGNITION setting.
+    """
+
+    def __init__(self, version, encodings, user_ids, users, config=None):
+        self.version = version
+        self.encodings = encodings
+        self.user_ids = user_ids
+        self.users = users
+        self.config = config or face_recognition_config()
+        self.matcher = build_matcher(encodings, self.config)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @classmethod
+    def open(cls, directory, version):
+        # The matrix is memory-mapped, so every worker shares the page cache copy
+        encodings = np.load(os.path.join(directory, ENCODINGS_FILE.format(version)), mmap_mode='r')
+        user_ids = np.load(os.path.join(directory, IDS_FILE.format(version)))
+        with open(os.path.join(directory, USERS_FILE.format(version))) as f:
+            users = json.load(f)
+        return cls(version, encodings, user_ids, users)
+
+    def match(self, encoding, tolerance=None):
+        """Return (user, distance) for the closest face within ``tolerance``, or None."""
+        if tolerance is None:
+            tolerance = self.config['tolerance']
+        found = self.matcher.search(encoding, tolerance)
+        if found is None:
+            return None
+        row, distance = found
+        return self.users[row], distance
+
+
+def face_index_dir():
+    return settings.FACE_INDEX_DIR
+
+
+def _write_atomically(path, write):
+    # Write next to the target and rename over it, so readers never see a partial file
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def _snapshot_lock(directory):
+    # Serialise writers, so an older read of the table never replaces a newer snapshot
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def load_encodings_from_db():
+    """Return (float32 N x 128 encodings, user ids, users) for every enrolled face."""
+    rows = list(
+        FaceProfile.objects.filter(face_encoding__isnull=False)
+        .order_by('pk')
+        .values_list('employee_id', 'face_encoding', 'employee__first_name',
+                     'employee__last_name', 'employee__email')
+    )
+    # Encodings are stored as float64 bytes
+    rows = [row for row in rows if len(row[1]) == FACE_ENCODING_SIZE * 8]
+    encodings = np.frombuffer(b''.join(bytes(row[1]) for row in rows), dtype=np.float64)
+    encodings = encodings.reshape(len(rows), FACE_ENCODING_SIZE).astype(np.float32)
+    user_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    users = [
+        {'id': row[0], 'name': f"{row[2]} {row[3]}".strip(), 'email': row[4]}
+        for row in rows
+    ]
+    return encodings, user_ids, users
+
+
+def write_face_snapshot():
+    """
+    Write the enrolled faces to a new snapshot version, point CURRENT at it
+    and return the version. Versions before the previous one are removed;
+    a worker that still has one mapped keeps reading it until it notices
+    the new CURRENT.
+    """
+    directory = face_index_dir()
+    os.makedirs(directory, exist_ok=True)
+    with _snapshot_lock(directory):
+        encodings, user_ids, users = load_encodings_from_db()
+        version = str(time.time_ns())
+
+        _write_atomically(os.path.join(directory, ENCODINGS_FILE.format(version)), lambda f: np.save(f, encodings))
+        _write_atomically(os.path.join(directory, IDS_FILE.format(version)), lambda f: np.save(f, user_ids))
+        _write_atomically(
+            os.path.join(directory, USERS_FILE.format(version)), lambda f: f.write(json.dumps(users).encode())
+        )
+        current = os.path.join(directory, CURRENT_FILE)
+        try:
+            with open(current) as f:
+                previous = f.read().strip()
+        except FileNotFoundError:
+            previous = None
+        _write_atomically(current, lambda f: f.write(version.encode()))
+
+        # Keep the previous version too, for a worker that read CURRENT just before the swap
+        live = {CURRENT_FILE}
+        for kept in filter(None, (version, previous)):
+            live |= {name.format(kept) for name in (ENCODINGS_FILE, IDS_FILE, USERS_FILE)}
+        for name in os.listdir(directory):
+            if name not in live and SNAPSHOT_FILE_RE.fullmatch(name):
+                try:
+                    os.unlink(os.path.join(directory, name))
+                except OSError:
+                    pass
+    return version
+
+
+_index = None
+_index_stat = None
+_index_lock = threading.Lock()
+
+
+def get_face_index():
+    """
+    The FaceIndex for the snapshot named by CURRENT. Each call costs one
+    stat() of CURRENT; the snapshot is reopened only after it was replaced.
+    A missing snapshot is written from the database first.
+    """
+    global _index, _index_stat
+    current = os.path.join(face_index_dir(), CURRENT_FILE)
+    try:
+        st = os.stat(current)
+    except FileNotFoundError:
+        write_face_snapshot()
+        st = os.stat(current)
+    stat_key = (current, st.st_ino, st.st_mtime_ns)
+    if _index is not None and _index_stat == stat_key:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index_stat != stat_key:
+            with open(current) as f:
+                version = f.read().strip()
+            _index = FaceIndex.open(face_index_dir(), version)
+            _index_stat = stat_key
+        return _index
+
+
+_batch_depth = 0
+_batch_dirty = False
+_batch_lock = threading.Lock()
+
+
+def _refresh_snapshot():
+    try:
+        write_face_snapshot()
+    except OSError:
+        # The next recognition retries from the old snapshot; enrolment already succeeded
+        logger.exception("Could not write the face index snapshot")
+
+
+@contextmanager
+def batched_face_snapshot():
+    """
+    Coalesce snapshot writes for a bulk enrolment. FaceProfile commits inside
+    the block only mark the index dirty, and one snapshot is written on exit,
+    instead of one full rewrite per face.
+    """
+    global _batch_depth, _batch_dirty
+    with _batch_lock:
+        _batch_depth += 1
+    try:
+        yield
+    finally:
+        with _batch_lock:
+            _batch_depth -= 1
+            write = not _batch_depth and _batch_dirty
+            if write:
+                _batch_dirty = False
+        if write:
+            _refresh_snapshot()
+
+
+def invalidate_face_index():
+    """Write a new snapshot once the current write commits, or at the end of the current batch."""
+    def refresh():
+        global _batch_dirty
+        with _batch_lock:
+            if _batch_depth:
+                _batch_dirty = True
+                return
+        _refresh_snapshot()
+    transaction.on_commit(refresh)
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class BruteForceMatcher:
+    """Exact search: the distance to every enrolled face, then argmin."""
+
+    def __init__(self, encodings):
+        self.encodings = encodings
+
+    def search(self, query, tolerance):
+        """Return (row, distance) of the closest face within ``tolerance``, or None."""
+        if not len(self.encodings):
+            return None
+        distances = np.linalg.norm(self.encodings - query, axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > tolerance:
+            return None
+        return best, float(distances[best])
+
+
+def _squared_distances(points, centroids):
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, as one matrix product instead of an N x K x 128 array
+    return (
+        np.einsum('ij,ij->i', points, points)[:, None]
+        - 2 * points @ centroids.T
+        + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+    )
+
+
+class IVFMatcher:
+    """
+    Approximate search with a coarse-quantized inverted file.
+
+    k-means splits the gallery into ``n_lists`` cells. A query is compared
+    with the ``n_probe`` cells whose centroids are nearest, then exactly with
+    the faces in those cells only. More probes give better recall and slower
+    searches; n_probe == n_lists is an exact search.
+    """
+
+    def __init__(self, encodings, n_lists=None, n_probe=8, iterations=10, train_size=50, seed=0):
+        self.encodings = encodings
+        count = len(encodings)
+        self.n_lists = max(1, min(n_lists or int(np.sqrt(count)), count))
+        self.n_probe = min(n_probe, self.n_lists)
+        if not count:
+            self.centroids = np.empty((0, encodings.shape[1]), dtype=np.float32)
+            self.order = np.empty(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        rng = np.random.default_rng(seed)
+        # Train on a sample of about train_size faces per cell; assignment uses everyone
+        sample = np.asarray(encodings[rng.choice(count, min(count, self.n_lists * train_size), replace=False)],
+                            dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmin(_squared_distances(sample, centroids), axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            sizes = np.bincount(nearest, minlength=self.n_lists)
+            filled = sizes > 0
+            # An empty cell keeps its old centroid
+            centroids[filled] = sums[filled] / sizes[filled, None]
+        self.centroids = centroids
+
+        assignment = np.empty(count, dtype=np.int64)
+        for start in range(0, count, 10000):
+            chunk = np.asarray(encodings[start:start + 10000], dtype=np.float32)
+            assignment[start:start + 10000] = np.argmin(_squared_distances(chunk, centroids), axis=1)
+        # Rows grouped by cell: cell k holds order[offsets[k]:offsets[k + 1]]
+        self.order = np.argsort(assignment, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=self.n_lists))))
+
+    def search(self, query, tolerance):
+        """Return (row, distance) of the closest face within ``tolerance`` among the probed cells, or None."""
+        if not len(self.order):
+            return None
+        cell_distances = np.linalg.norm(self.centroids - query, axis=1)
+        probed = np.argpartition(cell_distances, self.n_probe - 1)[:self.n_probe]
+        rows = np.concatenate([self.order[self.offsets[k]:self.offsets[k + 1]] for k in probed])
+        if not len(rows):
+            return None
+        distances = np.linalg.norm(self.encodings[rows] - query, axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > tolerance:
+            return None
+        return int(rows[best]), float(distances[best])
+
+
+MATCHERS = {
+    'brute_force': BruteForceMatcher,
+    'ivf': IVFMatcher,
+}
+
+
+def build_matcher(encodings, config):
+    """The matcher named by config['matcher'], built over ``encodings``."""
+    name = config['matcher']
+    if name == 'ivf':
+        return IVFMatcher(encodings, n_lists=config['ivf_lists'], n_probe=config['ivf_probe'])
+    try:
+        return MATCHERS[name](encodings)
+    except KeyError:
+        raise ValueError(f"Unknown face matcher '{name}'; choose one of {', '.join(MATCHERS)}.")
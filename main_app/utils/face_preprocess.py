@@ -0,0 +1,113 @@
+import time
+from contextlib import contextmanager
+
+import cv2
+import face_recognition
+import numpy as np
+from django.conf import settings
+
+
+# Overridden per deployment with the FACE_RECOGNITION setting
+DEFAULT_FACE_RECOGNITION = {
+    # Frames wider than this are downscaled before detection (0 keeps full size)
+    'detect_width': 480,
+    # 'hog' runs on the CPU; 'cnn' is more accurate but needs a GPU to be fast
+    'model': 'hog',
+    # Extra upsampling passes help find small faces, at a steep cost per pass
+    'upsample': 1,
+    # Which detected face to encode: 'largest' or 'center'
+    'roi': 'largest',
+    # Margin around the face, as a fraction of its size, kept in the encoding crop
+    'crop_margin': 0.25,
+    # Largest face distance accepted as a match (face_recognition's default is 0.6)
+    'tolerance': 0.5,
+    # 'brute_force' (exact) or 'ivf' (approximate, for large galleries; see utils.face_matchers)
+    'matcher': 'brute_force',
+    # IVF cells (None: square root of the gallery size) and cells searched per query
+    'ivf_lists': None,
+    'ivf_probe': 8,
+}
+
+
+def face_recognition_config():
+    return {**DEFAULT_FACE_RECOGNITION, **getattr(settings, 'FACE_RECOGNITION', {})}
+
+
+class StageTimer:
+    """Wall-clock milliseconds per named stage, in the order they ran."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def server_timing(self):
+        """The timings as a Server-Timing header value (shown in browser dev tools)."""
+        return ', '.join(f"{name};dur={ms:.1f}" for name, ms in self.timings.items())
+
+
+def select_face(locations, frame_shape, roi='largest'):
+    """Pick one (top, right, bottom, left) box: the largest, or the one nearest the centre."""
+    if roi == 'center':
+        centre_y, centre_x = frame_shape[0] / 2, frame_shape[1] / 2
+        return min(
+            locations,
+            key=lambda box: ((box[0] + box[2]) / 2 - centre_y) ** 2 + ((box[1] + box[3]) / 2 - centre_x) ** 2,
+        )
+    return max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+
+
+def encode_frame(image_bytes, timer, config=None):
+    """
+    Decode a JPEG/PNG frame and return the encoding of one face in it, or
+    None when no face is found.
+
+    Detection runs on a downscaled RGB copy. The chosen face is then cut out
+    of the full-resolution frame (plus a margin), converted to RGB and
+    encoded on its own, so the encoder never sees the rest of the frame.
+    """
+    config = config or face_recognition_config()
+
+    with timer.stage('decode'):
+        frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError('Could not decode the image')
+
+    with timer.stage('resize'):
+        height, width = frame.shape[:2]
+        scale = 1.0
+        small = frame
+        if config['detect_width'] and width > config['detect_width']:
+            scale = config['detect_width'] / width
+            small = cv2.resize(frame, (config['detect_width'], round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    with timer.stage('convert'):
+        # OpenCV decodes to BGR; dlib expects RGB
+        small_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+    with timer.stage('detect'):
+        locations = face_recognition.face_locations(
+            small_rgb, number_of_times_to_upsample=config['upsample'], model=config['model']
+        )
+    if not locations:
+        return None
+
+    with timer.stage('roi'):
+        top, right, bottom, left = select_face(locations, small_rgb.shape, config['roi'])
+        # Back to full-resolution coordinates, with a margin for the landmark model
+        top, right, bottom, left = (round(v / scale) for v in (top, right, bottom, left))
+        margin = round(max(bottom - top, right - left) * config['crop_margin'])
+        crop_top, crop_left = max(top - margin, 0), max(left - margin, 0)
+        crop = frame[crop_top:min(bottom + margin, height), crop_left:min(right + margin, width)]
+        crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        box = (top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)
+
+    with timer.stage('encode'):
+        encodings = face_recognition.face_encodings(crop_rgb, [box])
+    return encodings[0] if encodings else None
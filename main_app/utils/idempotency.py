@@ -0,0 +1,111 @@
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.http.request import RawPostDataException
+from django.shortcuts import redirect
+
+
+# Keys live in the default cache. Only a shared cache (REDIS_URL) deduplicates
+# across workers; with the per-process LocMemCache a retry that reaches another
+# worker runs the view again, so only same-worker double clicks are caught.
+# Responses to requests sent with an Idempotency-Key header are kept this long
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+# Without a header, an identical POST (same user, path and body) within this
+# many seconds is treated as a double click and gets the first response
+DUPLICATE_WINDOW = 5
+# How long a request may hold its key before a duplicate is allowed to run
+IN_PROGRESS_TIMEOUT = 60
+
+IDEMPOTENCY_CACHE_KEY = 'idempotency:{}'
+IN_PROGRESS = 'in_progress'
+IN_PROGRESS_MESSAGE = 'This request is already being processed.'
+# Response headers worth replaying
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _body_fingerprint(request):
+    try:
+        return _digest(request.path, request.body)
+    except RawPostDataException:
+        # A multipart body already consumed by request.POST (e.g. by the CSRF check)
+        files = sorted((name, f.name, f.size) for name, f in request.FILES.items())
+        return _digest(request.path, sorted(request.POST.lists()), files)
+
+
+def _replay(stored):
+    response = HttpResponse(stored['content'], status=stored['status'])
+    for header, value in stored['headers']:
+        response[header] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view=None, *, in_progress_redirect=None):
+    """
+    Run a mutating view at most once per idempotency key.
+
+    Applies to POST requests. The key is the client's Idempotency-Key header,
+    or else a fingerprint of the request body, which only deduplicates for
+    DUPLICATE_WINDOW seconds. A repeated key gets the stored response back
+    without running the view. A duplicate that arrives while the first request
+    is still running gets a JSON 409, or, for HTML form views decorated with
+    ``@idempotent(in_progress_redirect='url_name')``, a redirect there with a
+    message. Server errors and streaming responses are not stored, so those
+    requests can be retried.
+    """
+    if view is None:
+        return lambda view: idempotent(view, in_progress_redirect=in_progress_redirect)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+
+        client_key = request.headers.get('Idempotency-Key')
+        if client_key:
+            # A reused key with a different body is still answered from the store
+            key, ttl = _digest(client_key), IDEMPOTENCY_KEY_TTL
+        else:
+            key, ttl = _body_fingerprint(request), DUPLICATE_WINDOW
+        cache_key = IDEMPOTENCY_CACHE_KEY.format(_digest(request.user.pk, view.__module__, view.__name__, key))
+
+        # add() claims the key; if it is taken, answer from whatever is stored
+        if not cache.add(cache_key, IN_PROGRESS, IN_PROGRESS_TIMEOUT):
+            stored = cache.get(cache_key)
+            if stored is not None and stored != IN_PROGRESS:
+                return _replay(stored)
+            if in_progress_redirect:
+                messages.info(request, IN_PROGRESS_MESSAGE)
+                return redirect(in_progress_redirect)
+            return JsonResponse(
+                {'success': False, 'status': 'error', 'message': IN_PROGRESS_MESSAGE},
+                status=409
+            )
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            cache.delete(cache_key)
+            raise
+
+        if response.streaming or response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'status': response.status_code,
+                'content': response.content,
+                'headers': [(h, response[h]) for h in REPLAYED_HEADERS if response.has_header(h)],
+            }, ttl)
+        return response
+    return wrapper
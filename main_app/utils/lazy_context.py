@@ -0,0 +1,42 @@
+from functools import partial, wraps
+
+
+class MissingContextValue(Exception):
+    # Render missing keys like an undefined template variable
+    silent_variable_failure = True
+
+
+class LazyContext:
+    """Runs a context processor once, the first time one of its values is read."""
+
+    def __init__(self, processor, request):
+        self.processor = processor
+        self.request = request
+        self._values = None
+
+    def resolve(self, key):
+        if self._values is None:
+            self._values = self.processor(self.request)
+        try:
+            return self._values[key]
+        except KeyError:
+            raise MissingContextValue(key)
+
+
+def lazy_context(processor, keys):
+    """
+    Wrap a context processor so that it only runs when a template actually
+    uses one of its ``keys``.
+
+    Every key is exposed as a callable; the template engine calls it on
+    first access, so partials and PDF templates that never reference the
+    values skip the processor's queries entirely. Python callers should keep
+    calling the wrapped processor directly.
+    """
+    @wraps(processor)
+    def lazy_processor(request):
+        context = LazyContext(processor, request)
+        return {key: partial(context.resolve, key) for key in keys}
+
+    lazy_processor.eager = processor
+    return lazy_processor
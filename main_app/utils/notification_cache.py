@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .realtime import push_badge_update
+from .versioned_cache import bump_version
+
+
+NOTIFICATION_VERSION_KEY = 'notification_version:{}'
+# HR managers see asset notifications addressed to every manager, so those
+# badges also depend on a shared version that is bumped for any asset change.
+ASSET_NOTIFICATION_VERSION_KEY = 'notification_version:asset'
+UNREAD_COUNTS_KEY = 'notification_counts:{}:{}:{}'
+UNREAD_COUNTS_TIMEOUT = 60 * 60 * 24
+# Long-poll limits for the check-notifications endpoint, in seconds
+NOTIFICATION_POLL_INTERVAL = 1
+NOTIFICATION_MAX_WAIT = 30
+
+
+def bump_notification_version(user_ids, asset=False):
+    """
+    Invalidate the cached badge counts of the given users and push the new
+    ones, once the current write commits. Bumping earlier would let a badge
+    poll cache the uncommitted counts under the new version.
+    """
+    user_ids = set(user_ids)
+
+    def bump():
+        for user_id in user_ids:
+            bump_version(NOTIFICATION_VERSION_KEY.format(user_id))
+        if asset:
+            bump_version(ASSET_NOTIFICATION_VERSION_KEY)
+        push_badge_update(user_ids, asset=asset)
+    transaction.on_commit(bump)
+
+
+def get_notification_version(user_id):
+    """Return the (user, asset) version pair the counts cache is keyed on."""
+    user_key = NOTIFICATION_VERSION_KEY.format(user_id)
+    versions = cache.get_many([user_key, ASSET_NOTIFICATION_VERSION_KEY])
+    return versions.get(user_key, 0), versions.get(ASSET_NOTIFICATION_VERSION_KEY, 0)
+
+
+def unread_counts_key(user_id, version):
+    return UNREAD_COUNTS_KEY.format(user_id, *version)
+
+
+def notification_etag(user_id):
+    """ETag for the user's badge counts; changes whenever either version is bumped."""
+    return '"{}-{}"'.format(*get_notification_version(user_id))
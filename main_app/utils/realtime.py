@@ -0,0 +1,49 @@
+import json
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# HR managers see every manager-addressed asset request, so they also listen here
+HR_ASSET_GROUP = 'notifications_hr_asset'
+
+
+def user_group(user_id):
+    return f'notifications_user_{user_id}'
+
+
+def _group_send(groups, message):
+    """Send ``message`` to the groups once the current transaction commits."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+
+    def send():
+        for group in groups:
+            try:
+                async_to_sync(layer.group_send)(group, message)
+            except Exception as e:
+                # Push is best effort; clients fall back to polling
+                logger.warning(f"Could not push to {group}: {e}")
+
+    transaction.on_commit(send)
+
+
+def push_badge_update(user_ids, asset=False):
+    """Ask the connected sockets of these users to resend their badge counts."""
+    groups = [user_group(user_id) for user_id in set(user_ids)]
+    if asset:
+        groups.append(HR_ASSET_GROUP)
+    if groups:
+        _group_send(groups, {'type': 'badge.update'})
+
+
+def push_event(user_id, event, **payload):
+    """Push a named event (new notification, clock state, ...) to one user."""
+    # Channel layers only carry plain JSON-like values, so dates become strings here
+    payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+    _group_send([user_group(user_id)], {'type': 'push.event', 'event': event, 'payload': payload})
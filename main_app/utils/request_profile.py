@@ -0,0 +1,100 @@
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from main_app.models import CustomUser
+
+
+HR_DEPARTMENT_NAMES = ['hr', 'h r']
+
+
+class RequestProfile:
+    """
+    The logged-in user together with their Admin/Manager/Employee row,
+    department and division, loaded with a single select_related query
+    the first time a request needs it.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def user(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return user
+        loaded = CustomUser.objects.select_related(
+            'admin',
+            'manager__department__division',
+            'manager__division',
+            'employee__department__division',
+            'employee__division',
+            'employee__team_lead__admin',
+        ).get(pk=user.pk)
+        # Share the loaded relations with request.user so that views using
+        # request.user.employee / request.user.manager do not query again
+        user._state.fields_cache.update(loaded._state.fields_cache)
+        return loaded
+
+    @property
+    def is_authenticated(self):
+        return self.request.user.is_authenticated
+
+    def _related(self, name):
+        if not self.is_authenticated:
+            return None
+        return getattr(self.user, name, None)
+
+    @cached_property
+    def employee(self):
+        return self._related('employee')
+
+    @cached_property
+    def manager(self):
+        return self._related('manager')
+
+    @cached_property
+    def admin(self):
+        return self._related('admin')
+
+    def employee_or_404(self):
+        if self.employee is None:
+            raise Http404("No Employee matches the given query.")
+        return self.employee
+
+    def manager_or_404(self):
+        if self.manager is None:
+            raise Http404("No Manager matches the given query.")
+        return self.manager
+
+    @cached_property
+    def role(self):
+        if not self.is_authenticated:
+            return None
+        return {'1': 'ceo', '2': 'manager', '3': 'employee'}.get(self.user.user_type)
+
+    @cached_property
+    def member(self):
+        """The Employee or Manager row the user clocks in as."""
+        return self.employee or self.manager
+
+    @cached_property
+    def department(self):
+        return self.member.department if self.member else None
+
+    @cached_property
+    def division(self):
+        return self.member.division if self.member else None
+
+    @cached_property
+    def is_hr(self):
+        return bool(
+            self.manager and self.department
+            and self.department.name.lower().strip() in HR_DEPARTMENT_NAMES
+        )
+
+
+def get_request_profile(request):
+    profile = getattr(request, '_request_profile', None)
+    if profile is None:
+        profile = request._request_profile = RequestProfile(request)
+    return profile
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Backends that keep entries in each worker process. A version bump or a
+# refreshed entry in one worker is invisible to the others.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# Longest an entry may be served stale by another worker on such a backend
+PROCESS_LOCAL_TIMEOUT = 10
+
+
+def cache_is_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def cache_timeout(timeout):
+    """``timeout`` on a shared cache; a few seconds on a per-process one."""
+    return timeout if cache_is_shared() else min(timeout, PROCESS_LOCAL_TIMEOUT)
+
+
+def bump_version(key):
+    """Increment a cache version counter, invalidating every key built on it."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key missing or evicted, start a fresh version
+        cache.add(key, 1, timeout=None)
+        cache.incr(key)
+
+
+def get_version(key):
+    return cache.get(key, 0)
@@ -1,7 +1,11 @@
+import asyncio
 import json
+from functools import lru_cache
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
-from django.http import HttpResponse, JsonResponse,HttpResponseRedirect
+from django.http import HttpResponse, JsonResponse,HttpResponseRedirect,HttpResponseNotModified
+from django.utils.cache import patch_cache_control
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
@@ -12,7 +16,7 @@ from .models import *
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import BasicAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework import status
 from datetime import datetime, time
 from dotenv import load_dotenv
@@ -21,13 +25,22 @@ from django.urls import reverse
 from django.http import HttpResponseForbidden
 from django.db.models import Q,Value
 from django.contrib.auth.models import User
-from main_app.notification_badge import send_notification
-from .context_processors import unread_notification_count
+from main_app.notification_badge import send_notification, get_unread_counts, badge_payload
+from main_app.utils.notification_cache import NOTIFICATION_MAX_WAIT, NOTIFICATION_POLL_INTERVAL, notification_etag
 from django.db.models.functions import Concat
+from .authentication import CachedTokenAuthentication
 from .utils.face_encoding import get_face_encoding
 from .utils.handle_clokin import handle_clock_in
-import cv2
-import face_recognition
+from .utils.activity_log import log_activity
+from .utils.clock_in import ClockInError, clock_in
+from .utils.clock_actions import clock_out
+from .utils.idempotency import idempotent
+from .utils.face_index import get_face_index
+from .utils.face_preprocess import StageTimer, encode_frame
+from .utils.face_enrollment import face_enrollment_response, queue_face_enrollment
+from .utils.clock_events import (
+    MAX_SYNC_EVENTS, clock_event_response, clock_queue_enabled, enqueue_clock_event, sync_clock_events
+)
 from django.core.cache import cache
 import base64
 
@@ -77,7 +90,9 @@ def logout_user(request):
     return redirect('login_page')
 
 
+@lru_cache(maxsize=1)
 def get_router_ip():
+    # Interfaces do not change while the process runs; psutil enumerates them all
     for conn in psutil.net_if_addrs().values():
         for snic in conn:
             if snic.family.name == "AF_INET" and snic.address != "127.0.0.1":
@@ -86,7 +101,7 @@ def get_router_ip():
 
 
 class AttendanceActionView(APIView):
-    authentication_classes = [BasicAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -94,25 +109,28 @@ class AttendanceActionView(APIView):
         action = request.data.get('action')
         notes = request.data.get('notes', '')
 
-        current_record = AttendanceRecord.objects.filter(
+        current_record = AttendanceRecord.objects.select_related('open_break').filter(
             user=user, clock_out__isnull=True
         ).first()
         if action == 'clockin':
             if current_record:
                 return Response({'error': 'Already clocked in'}, status=status.HTTP_400_BAD_REQUEST)
 
-            new_record = AttendanceRecord.objects.create(
-                user=user,
-                clock_in=timezone.now(),
-                notes=notes,
-                ip_address=get_router_ip()
-            )
+            if clock_queue_enabled():
+                event, _ = enqueue_clock_event(
+                    user.id, 'clock_in', timezone.now(),
+                    idempotency_key=request.headers.get('Idempotency-Key'),
+                    notes=notes,
+                    ip_address=get_router_ip(),
+                )
+                if event.status == 'rejected':
+                    return Response({'error': event.result, **clock_event_response(event)}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({'status': 'success', 'action': 'clocked_in', **clock_event_response(event)})
 
-            ActivityFeed.objects.create(
-                user=user,
-                activity_type='clock_in',
-                related_record=new_record
-            )
+            try:
+                clock_in(user.id, timezone.now(), notes=notes, ip_address=get_router_ip())
+            except ClockInError as e:
+                return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({'status': 'success', 'action': 'clocked_in'})
 
@@ -124,7 +142,7 @@ class AttendanceActionView(APIView):
             current_record.notes = notes
             current_record.save()
 
-            ActivityFeed.objects.create(
+            log_activity(
                 user=user,
                 activity_type='clock_out',
                 related_record=current_record
@@ -136,17 +154,14 @@ class AttendanceActionView(APIView):
             if not current_record:
                 return Response({'error': 'You must be clocked in to take a break'}, status=status.HTTP_400_BAD_REQUEST)
 
-            current_break = Break.objects.filter(
-                attendance_record=current_record,
-                break_end__isnull=True
-            ).first()
+            current_break = current_record.open_break
 
             if current_break:
                 # End break
                 current_break.break_end = timezone.now()
                 current_break.save()
 
-                ActivityFeed.objects.create(
+                log_activity(
                     user=user,
                     activity_type='break_end',
                     related_record=current_record
@@ -160,7 +175,7 @@ class AttendanceActionView(APIView):
                     break_start=timezone.now()
                 )
 
-                ActivityFeed.objects.create(
+                log_activity(
                     user=user,
                     activity_type='break_start',
                     related_record=current_record
@@ -170,88 +185,63 @@ class AttendanceActionView(APIView):
         else:
             return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
 
+class ClockEventSyncView(APIView):
+    """
+    Upload clock and break events recorded while a kiosk or mobile client was
+    offline. The body is {"events": [{"action", "timestamp", "idempotency_key",
+    ...}, ...]} in the order they happened; the response lists one result per
+    event. A CEO account running a shared kiosk may pass "user_id" to sync on
+    behalf of another user.
+    """
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({'error': 'events must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > MAX_SYNC_EVENTS:
+            return Response(
+                {'error': f'At most {MAX_SYNC_EVENTS} events can be synced at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = request.user.id
+        target_id = request.data.get('user_id')
+        if target_id and str(target_id) != str(user_id):
+            if request.user.user_type != '1':
+                return Response({'error': 'Not allowed to sync for another user'}, status=status.HTTP_403_FORBIDDEN)
+            if not CustomUser.objects.filter(pk=target_id).exists():
+                return Response({'error': 'User not found'}, status=status.HTTP_400_BAD_REQUEST)
+            user_id = target_id
+
+        return Response({'results': sync_clock_events(user_id, events)})
+
+
 @login_required
+@idempotent
 def clock_in_out(request):
     if request.method == 'POST':
         now = timezone.now()
         today = now.date()
 
-        user_ = get_object_or_404(CustomUser, email=request.user.email)
+        user_ = request.profile.user
         
         if 'clock_in' in request.POST:
             return handle_clock_in(request,user_,now,today)
 
         if 'clock_out' in request.POST:
-            current_record = AttendanceRecord.objects.filter(
-                user=request.user,
-                date=today,
-                clock_out__isnull=True
-            ).first()
-
-            if not current_record:
+            try:
+                clock_out(user_.id, now, notes=request.POST.get('notes', ''))
+            except ClockInError as e:
                 return JsonResponse({
                     'status': 'error',
-                    'message': 'No active clock-in record found to clock out.'
+                    'message': e.message
                 }, status=400)
-            
-            manager = Manager.objects.filter(admin=request.user).first()
-            if manager:
-                current_record.clock_out = now
-                current_record.notes = request.POST.get('notes', '')
-                current_record.full_clean()
-                current_record.save()
-
-                ActivityFeed.objects.create(
-                    user=request.user,
-                    activity_type='clock_out',
-                    related_record=current_record
-                )
-
-                return JsonResponse({
-                    'status': 'success',
-                    'message': 'Successfully clocked out!'
-                })
-            
-            # Check if today's update has been submitted (applies to all employees)
-            employee = Employee.objects.filter(admin=request.user).first()
-            if employee:
-                schedule = DailySchedule.objects.filter(
-                    employee=employee,
-                    date=today
-                ).first()
-
-                if schedule:
-                    has_submitted_update = DailyUpdate.objects.filter(
-                        schedule=schedule,
-                        updated_at__date=today
-                    ).exists()
-                    if not has_submitted_update:
-                        return JsonResponse({
-                            'status': 'error',
-                            'message': "Cannot clock out without submitting today's update."
-                        }, status=400)
-                else:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'No schedule found for today. Cannot clock out without a schedule and update.'
-                    }, status=400)
-
-                # Update clock-out time
-                current_record.clock_out = now
-                current_record.notes = request.POST.get('notes', '')
-                current_record.full_clean()
-                current_record.save()
-
-                ActivityFeed.objects.create(
-                    user=request.user,
-                    activity_type='clock_out',
-                    related_record=current_record
-                )
-
-                return JsonResponse({
-                    'status': 'success',
-                    'message': 'Successfully clocked out!'
-                })
+            return JsonResponse({
+                'status': 'success',
+                'message': 'Successfully clocked out!'
+            })
 
         return JsonResponse({
             'status': 'error',
@@ -261,6 +251,13 @@ def clock_in_out(request):
     return HttpResponseRedirect('employee_home')
 
 
+@login_required
+def clock_event_status(request, event_id):
+    """Poll the outcome of a queued clock event (see ATTENDANCE_CLOCK_QUEUE)."""
+    event = get_object_or_404(ClockEvent, idempotency_key=event_id, user=request.user)
+    return JsonResponse(clock_event_response(event))
+
+
 # @login_required
 # def clock_in_out(request):
 #     if request.method == 'POST':
@@ -383,6 +380,7 @@ def clock_in_out(request):
 
 
 @login_required
+@idempotent
 def break_action(request):
     if request.method == 'POST':
         data = json.loads(request.body)
@@ -396,7 +394,7 @@ def break_action(request):
             except User.DoesNotExist:
                 return JsonResponse({'error': 'User not found'}, status=400)
 
-        current_record = AttendanceRecord.objects.filter(
+        current_record = AttendanceRecord.objects.select_related('open_break').filter(
             user=target_user, 
             clock_out__isnull=True,
             date = timezone.now().date()
@@ -406,24 +404,15 @@ def break_action(request):
             return JsonResponse({'error': 'You must be clocked in to take a break'}, status=400)
         
         if action_type == 'check_lunch':
-            today = timezone.now().date()
-            lunch_taken = Break.objects.filter(
-                attendance_record__user=target_user,
-                break_type='lunch',
-                break_start__date=today
-            ).exists()
-            return JsonResponse({'lunch_taken': lunch_taken})
+            return JsonResponse({'lunch_taken': current_record.lunch_taken})
         
-        current_break = Break.objects.filter(
-            attendance_record=current_record,
-            break_end__isnull=True
-        ).first()
+        current_break = current_record.open_break
         
         if current_break:
             # End break
             current_break.break_end = timezone.now()
             current_break.save()
-            ActivityFeed.objects.create(
+            log_activity(
                 user=target_user,
                 activity_type='break_end',
                 related_record=current_record
@@ -434,14 +423,7 @@ def break_action(request):
             break_type = data.get('break_type', 'short')
             
             if break_type == 'lunch':
-                today = timezone.now().date()
-                lunch_taken = Break.objects.filter(
-                    attendance_record__user=target_user,
-                    break_type='lunch',
-                    break_start__date=today
-                ).exists()
-                
-                if lunch_taken:
+                if current_record.lunch_taken:
                     return JsonResponse({
                         'status': 'error',
                         'message': 'You have already taken your lunch break today.',
@@ -455,7 +437,7 @@ def break_action(request):
             )
             
             activity_type = 'break_start_short' if break_type == 'short' else 'break_start_lunch'
-            ActivityFeed.objects.create(
+            log_activity(
                 user=target_user,
                 activity_type=activity_type,
                 related_record=current_record
@@ -569,8 +551,8 @@ def early_clock_out_request(request):
                 user=request.user,
                 reason=reason
             )
-            employee = get_object_or_404(Employee, admin_id=request.user.id)
-            user = CustomUser.objects.filter(id=employee.team_lead.admin.id).first()
+            employee = request.profile.employee_or_404()
+            user = employee.team_lead.admin
             send_notification(user, reason, "clockout-notification", obj.id, "manager")
 
             hr_users = Manager.objects.filter(department__name__iexact='HR') | \
@@ -741,85 +723,80 @@ def all_employees_schedules(request):
 
 
 
+async def wait_for_notification_change(user_id, etag, wait):
+    """Poll the notification version until it no longer matches ``etag`` or ``wait`` seconds pass."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while loop.time() < deadline:
+        await asyncio.sleep(min(NOTIFICATION_POLL_INTERVAL, deadline - loop.time()))
+        current = await sync_to_async(notification_etag)(user_id)
+        if current != etag:
+            return current
+    return etag
+
+
 @login_required
-def check_new_notification(request):
-    if not request.user.is_authenticated:
+async def check_new_notification(request):
+    user = await request.auser()
+    if not user.is_authenticated:
         return JsonResponse({'success' : False , 'error' : 'User is not authenticated.'})
-        
-    context = unread_notification_count(request)
-    # Map context_processor keys to the script's expected keys
-    response_data = {
-        'success': True,
-        'total': context['total_unread_notifications'],
-        'last_updated' : timezone.now(),
-    }
 
-    if request.user.user_type == '2':  # Manager
-        response_data.update({
-            'general': context['manager_general_count'],
-            'leave': context['employee_leave_request_to_manager_count'],
-            'clockout': context['employee_clockout_request_to_manager_count'],
-            'asset': context['total_asset_unread_notifications'],
-            'manager_leave': context['manager_leave_request_from_ceo_count']
-        })
-    elif request.user.user_type == '1':  # CEO
-        response_data.update({
-            'manager_leave': context['ceo_notification_from_manager_leave_request'],
-            'employee_leave': context['ceo_notification_from_employee_leave_request']
-        })
-    else:  # Employee
-        response_data.update({
-            'from_manager': context['employee_notification_from_manager_count'],
-            'leave_status': context['employee_leave_approved_or_rejected_notification_count'],
-            'clockout': context['employee_clockout_request_to_manager_count'],
-            'asset' : context['employee_asset_request']
-        })
-    
-    return JsonResponse(response_data)
+    # Clients send back the ETag of their last response; while the version is
+    # unchanged they get a bodiless 304. With ?wait=N the request is held open
+    # (without blocking a thread) until the version moves or N seconds pass.
+    etag = await sync_to_async(notification_etag)(user.pk)
+    client_etag = request.headers.get('If-None-Match')
+    try:
+        wait = min(max(float(request.GET.get('wait', 0)), 0), NOTIFICATION_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    if wait and client_etag == etag:
+        etag = await wait_for_notification_change(user.pk, etag, wait)
+    if client_etag == etag:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    counts = await sync_to_async(get_unread_counts)(user, request.profile)
+    response = JsonResponse(badge_payload(counts))
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 
 def register_face(request):
+    """
+    Queue a face photo for enrollment. Encoding runs in the background worker
+    pool; poll the returned status_url until the status is done or failed.
+    """
     if request.method == 'POST':
-        try:
-            employee = CustomUser.objects.filter(email=request.POST.get('email')).first()
-            face_image = request.FILES.get("face_image")
-            print(face_image)
-            if not employee or not face_image:
-                return JsonResponse({'error': 'Employee not found with provided email.'}, status=400)
-
-            # create or update face profile
-            face_profile, created = FaceProfile.objects.get_or_create(
-                employee = employee,
-                defaults={
-                    'face_image' : face_image
-                }
-            )
-
-            if not created:
-                face_profile.face_image = face_image
-                face_profile.face_encoding = None
-                face_profile.save()
+        employee = CustomUser.objects.filter(email=request.POST.get('email')).first()
+        face_image = request.FILES.get("face_image")
+        if not employee or not face_image:
+            return JsonResponse({'error': 'Employee not found with provided email.'}, status=400)
 
-            img = face_recognition.load_image_file(face_profile.face_image.path)
-            encodings = face_recognition.face_encodings(img)
-            if encodings:
-                face_profile.face_encoding = encodings[0].tobytes()
-                face_profile.save()
-                return JsonResponse({
-                    'success': True,
-                    'email': employee.email  # Return email for verification
-                })
-            else:
-                return JsonResponse({'error': 'No face detected'}, status=400)
+        job = queue_face_enrollment(employee, face_image, requested_by=request.user)
+        return JsonResponse({
+            'success': True,
+            'email': employee.email,  # Return email for verification
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': reverse('face_enrollment_status', args=[job.pk]),
+        }, status=202)
 
-        except Exception as e:
-            return JsonResponse({
-                'error': 'Employee not found with provided ID and email'
-            }, status=404)
-        
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+
+@login_required
+def face_enrollment_status(request, job_id):
+    jobs = FaceEnrollmentJob.objects.select_related('employee')
+    if request.user.user_type != '1':
+        jobs = jobs.filter(Q(requested_by=request.user) | Q(employee=request.user))
+    job = get_object_or_404(jobs, pk=job_id)
+    return JsonResponse(face_enrollment_response(job))
+
 from django.conf import settings
 
 @csrf_exempt
@@ -852,159 +829,88 @@ def open_camera(request):
 
 @csrf_exempt
 def recognize_face(request):
-    now = timezone.now()
-    today = now.date()
     if request.method == "POST":
-        try:
-            image_data = request.POST.get('image').split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            
-            # Convert to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            # Get all known faces
-            known_encodings, known_users = FaceProfile.get_all_encodings()
-            
-            # Detect faces in frame
-            face_locations = face_recognition.face_locations(frame)
-            face_encodings = face_recognition.face_encodings(frame, face_locations)
-            
-            if not face_encodings:
-                return JsonResponse({'status': 'no_face','message': 'No face detected in the image'})
-            
-            # Compare with known faces
-            for face_encoding in face_encodings:
-                matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-                
-                if True in matches:
-                    matched_idx = matches.index(True)
-                    user = known_users[matched_idx]
-                    user_ = get_object_or_404(CustomUser, id=user["id"])
-
-                    # check if already clocked in
-                    today = timezone.now().date()
-                    already_clocked_in = AttendanceRecord.objects.filter(
-                        user_id = user_.id,
-                        date = today,
-                        clock_in__isnull = False
-                    ).exists()
-
-                    if already_clocked_in:
-                        return JsonResponse({
-                            "error" : "recognized",
-                            "user": user,
-                            "message" : f"Hi,{user['name'].split()[0]},You are already clocked in for today."
-                        })
-                    
-                    # Check leave status
-                    leave = LeaveReportEmployee.objects.filter(
-                        employee__admin=user_,
-                        start_date__lte=today,
-                        end_date__gte=today,
-                        status=1
-                    ).first()
-
-                    leave_manager = LeaveReportManager.objects.filter(
-                        manager__admin = user_,
-                        start_date__lte=today,
-                        end_date__gte=today,
-                        status=1
-                    ).first()
-
-                    if leave:
-                        if leave.leave_type == 'Full-Day':
-                            return JsonResponse({
-                                'status': 'error',
-                                'message': 'Cannot clock in on an approved leave day.'
-                            }, status=400)
-                        
-                        #  for half-day leave
-                        current_time = now.time()
-                        # for first half leave, allow clock-in only after 1:00 pm
-                        if leave.half_day_type and current_time < time(13,0):
-                            return JsonResponse({
-                                'status': 'error',
-                                'message': 'For First Half leave, you can only clock in after 1:00 PM.'
-                            }, status=400)
-                        
-                        # For Second Half leave, allow clock-in only before 1:00 PM
-                        if leave.leave_type and current_time >= time(13, 0):
-                            return JsonResponse({
-                                'status': 'error',
-                                'message': 'For Second Half leave, you must clock in before 1:00 PM.'
-                            }, status=400)
-
-                    if leave_manager:
-                        if leave_manager.leave_type == 'Full-Day':
-                            return JsonResponse({
-                                'status': 'error',
-                                'message': 'Cannot clock in on an approved leave day.'
-                            }, status=400)
-                
-                    
-                    if not user_.is_second_shift:    
-                        # logic for non-second shift users
-                        on_time_threshold = datetime.combine(today, time(9, 0))
-                        late_threshold = datetime.combine(today, time(9, 30))
-                        half_day_threshold = datetime.combine(today, time(13, 0))
-
-                        earliest_clock_in = datetime.combine(today, time(8, 45)) if user_.user_type == "3" else datetime.combine(today, time(8, 30))
-
-                        if now < earliest_clock_in:
-                            return JsonResponse({
-                                'status': 'error',
-                                'message': f"Clock-in is not allowed before {'8:45 AM' if user_.user_type == '3' else '8:30 AM'} IST."
-                            }, status=400)
-
-                        status = 'present'
-                        if now > half_day_threshold or leave:
-                            status = 'half_day'
-                        elif now > late_threshold:
-                            status = 'late'
-                    else:
-                        # logic for second shift users
-                        status = 'present'  # Default status for second shift users
-                        if (leave_manager and leave_manager.leave_type == 'Half-Day'):
-                            status = 'half_day'
-
-                    # Create record only on successful validation
-                    department_id = request.POST.get('department')
-                    department = Department.objects.get(id=department_id) if department_id else None
-                    
-                    employee_ = Employee.objects.filter(admin=user_).first()
-                    current_user = employee_ if employee_ else Manager.objects.filter(admin=user_).first()
-
-                    new_record = AttendanceRecord.objects.create(
-                        user=user_,
-                        date=today,
-                        clock_in=now,
-                        department=current_user.department,
-                        status=status,
-                        ip_address=request.META.get('REMOTE_ADDR'),
-                        notes=request.POST.get('notes', ''),
-                        clock_in_type = "face clockin"
-                    )
-                    new_record.full_clean()
-                    new_record.save()
-
-                    ActivityFeed.objects.create(
-                        user=user_,
-                        activity_type='clock_in',
-                        related_record=new_record
-                    )
+        # Per-stage timings go out in the Server-Timing header for kiosk tuning
+        timer = StageTimer()
+        response = recognize_face_frame(request, timer)
+        response['Server-Timing'] = timer.server_timing()
+        return response
 
-                    return JsonResponse({
-                        'status': 'recognized',
-                        'user': user,
-                        'message': f"Good morning, {user['name'].split()[0]}!"
-                    })
-            
-            return JsonResponse({'status': 'unknown_face','message': 'Face not recognized in our system'})
-            
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)})
-    
     return JsonResponse({'status': 'invalid_request','message': 'Something went wrong'})
 
 
+def recognize_face_frame(request, timer):
+    now = timezone.now()
+    try:
+        image_data = request.POST.get('image').split(',')[1]
+        image_bytes = base64.b64decode(image_data)
+
+        # Detect and encode one face (see FACE_RECOGNITION in settings)
+        face_encoding = encode_frame(image_bytes, timer)
+
+        if face_encoding is None:
+            return JsonResponse({'status': 'no_face','message': 'No face detected in the image'})
+
+        # Compare with known faces
+        with timer.stage('match'):
+            match = get_face_index().match(face_encoding)
+
+        if not match:
+            return JsonResponse({'status': 'unknown_face','message': 'Face not recognized in our system'})
+
+        user, distance = match
+        if clock_queue_enabled():
+            event, created = enqueue_clock_event(
+                user["id"], 'clock_in', now,
+                ip_address=request.META.get('REMOTE_ADDR'),
+                notes=request.POST.get('notes', ''),
+                clock_in_type="face clockin",
+            )
+            if not created and event.status == 'applied':
+                return JsonResponse({
+                    "error" : "recognized",
+                    "user": user,
+                    "message" : f"Hi,{user['name'].split()[0]},You are already clocked in for today."
+                })
+            if event.status == 'rejected':
+                return JsonResponse({
+                    'status': 'error',
+                    'message': event.result,
+                }, status=400)
+            return JsonResponse({
+                'status': 'recognized',
+                'user': user,
+                'message': f"Good morning, {user['name'].split()[0]}!",
+                **clock_event_response(event),
+            })
+
+        try:
+            with timer.stage('clock_in'):
+                clock_in(
+                    user["id"], now,
+                    ip_address=request.META.get('REMOTE_ADDR'),
+                    notes=request.POST.get('notes', ''),
+                    clock_in_type="face clockin",
+                )
+        except ClockInError as e:
+            if e.code == 'already_clocked_in':
+                return JsonResponse({
+                    "error" : "recognized",
+                    "user": user,
+                    "message" : f"Hi,{user['name'].split()[0]},You are already clocked in for today."
+                })
+            return JsonResponse({
+                'status': 'error',
+                'message': e.message
+            }, status=400)
+
+        return JsonResponse({
+            'status': 'recognized',
+            'user': user,
+            'message': f"Good morning, {user['name'].split()[0]}!"
+        })
+
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+
@@ -34,6 +34,7 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
     'crispy_bootstrap4',
     'django_filters',
     'rest_framework',
+    'channels',
 
 ]
 
@@ -55,12 +57,12 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main_app.middleware.RequestProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'main_app.middleware.LoginCheckMiddleWare',
-    'main_app.middleware.RoleBasedAccessMiddleware',
 ]
 
 
@@ -88,11 +90,11 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'main_app.context_processors.clock_times',
-                'main_app.context_processors.unread_notification_count',
-                'main_app.context_processors.asset_notification_count',
-                'main_app.context_processors.admin_notification_count',
-                'main_app.context_processors.leave_balance_context',
+                'main_app.context_processors.lazy_clock_times',
+                'main_app.context_processors.lazy_unread_notification_count',
+                'main_app.context_processors.lazy_asset_notification_count',
+                'main_app.context_processors.lazy_admin_notification_count',
+                'main_app.context_processors.lazy_leave_balance_context',
             ],
         },
     },
@@ -107,6 +109,7 @@ TEMPLATES = [
 # 'main_app.context_processors.admin_notification_count',
 
 WSGI_APPLICATION = 'office_ops.wsgi.application'
+ASGI_APPLICATION = 'office_ops.asgi.application'
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap4"
 CRISPY_TEMPLATE_PACK = "bootstrap4"
@@ -118,9 +121,64 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # WAL lets requests read while a clock-in is being written, and
+        # IMMEDIATE transactions queue writers on the lock instead of failing
+        # with "database is locked" when a read transaction tries to write.
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Morning rush: when enabled, clock-ins are appended to the ClockEvent queue and
+# acknowledged immediately; run `manage.py process_clock_events` to apply them.
+ATTENDANCE_CLOCK_QUEUE = os.getenv("ATTENDANCE_CLOCK_QUEUE", "False").lower() in ("1", "true", "yes")
+
+# Offline clock and break events older than this are refused by the sync endpoint
+ATTENDANCE_SYNC_MAX_AGE_HOURS = int(os.getenv("ATTENDANCE_SYNC_MAX_AGE_HOURS", "24"))
+
+# Cache
+# Notification badge counts and the header clock state are cached per user and
+# invalidated by version keys or refreshed on write, so every worker process must
+# share one cache. Set REDIS_URL in production. Without it each process has its
+# own LocMemCache, and those entries are kept for a few seconds only
+# (main_app.utils.versioned_cache.cache_timeout).
+# Idempotency keys (main_app.utils.idempotency) also need the shared cache: on
+# LocMemCache a retried POST that reaches another worker runs a second time.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Channel layer for the notification websocket (main_app.consumers).
+# The in-memory layer only reaches sockets served by the same process.
+
+if os.getenv("REDIS_URL"):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.getenv("REDIS_URL")]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -164,6 +222,21 @@ MEDIA_URL = '/media/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Face encoding snapshots shared by all workers on this host (main_app.utils.face_index).
+# Keep it on local disk so the memory-mapped files live in the page cache once.
+FACE_INDEX_DIR = os.getenv("FACE_INDEX_DIR", os.path.join(BASE_DIR, 'face_index'))
+
+# Kiosk frame preprocessing (main_app.utils.face_preprocess.DEFAULT_FACE_RECOGNITION
+# documents every key); tune against the Server-Timing header of recognize_face.
+FACE_RECOGNITION = {
+    'detect_width': int(os.getenv("FACE_DETECT_WIDTH", "480")),
+    'model': os.getenv("FACE_DETECT_MODEL", "hog"),
+    'upsample': int(os.getenv("FACE_DETECT_UPSAMPLE", "1")),
+    'tolerance': float(os.getenv("FACE_MATCH_TOLERANCE", "0.5")),
+    # 'ivf' for galleries of tens of thousands; see `manage.py benchmark_face_matchers`
+    'matcher': os.getenv("FACE_MATCHER", "brute_force"),
+}
 AUTH_USER_MODEL = 'main_app.CustomUser'
 
 # Default primary key field type